@@ -1,14 +1,26 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, make_response
-from functools import wraps
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, make_response, abort, g, has_request_context
+from functools import lru_cache, wraps
 from datetime import datetime, date
+from werkzeug.exceptions import BadRequest
 from werkzeug.utils import secure_filename
+from PIL import Image, ImageOps, UnidentifiedImageError
+import atexit
+import hashlib
+import hmac
 import os
+import queue
+import tempfile
+import time
+from collections import defaultdict, namedtuple
 import uuid
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from config import Config
-from models import db, Player, Session, Court, Attendance, Payment, BirdieBank, DropoutRefund, SiteSettings
-from sqlalchemy import func
+from models import db, Player, Session, Court, Attendance, Payment, BirdieBank, DropoutRefund, SiteSettings, year_month, round_cents
+from sqlalchemy import func, and_, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import contains_eager, lazyload, load_only, raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from flask_wtf.csrf import CSRFProtect
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -19,36 +31,114 @@ app = Flask(__name__)
 app.config.from_object(Config)
 
 # Caching Configuration
-app.config['CACHE_TYPE'] = 'SimpleCache'  # In-memory cache (use 'RedisCache' for production with Redis)
+app.config['CACHE_TYPE'] = 'SimpleCache'  # In-memory cache (per worker process)
 app.config['CACHE_DEFAULT_TIMEOUT'] = 300  # 5 minutes default
+if app.config.get('REDIS_URL'):
+    # Shared across workers, so a write in one worker invalidates cached totals for all of them
+    app.config['CACHE_TYPE'] = 'RedisCache'
+    app.config['CACHE_REDIS_URL'] = app.config['REDIS_URL']
+    app.config['CACHE_KEY_PREFIX'] = 'bpbadi:cache:'
+    app.config['CACHE_OPTIONS'] = {'socket_timeout': 1}
 cache = Cache(app)
 
+# Server-side sessions in Redis when REDIS_URL is set (signed cookie sessions otherwise)
+session_redis = None
+if app.config.get('REDIS_URL'):
+    import redis
+    from flask_session import Session as ServerSession
+    session_redis = redis.from_url(app.config['REDIS_URL'], socket_timeout=1)
+    app.config['SESSION_TYPE'] = 'redis'
+    app.config['SESSION_REDIS'] = session_redis
+    app.config['SESSION_PERMANENT'] = False  # Same lifetime as the cookie session it replaces
+    ServerSession(app)
+
 # CSRF Protection
 csrf = CSRFProtect(app)
 
-# Rate Limiting
+# Rate Limiting - counters live in Redis when REDIS_URL is set so every gunicorn worker
+# enforces the same limit (per-worker memory otherwise, falling back to it if Redis is down)
+limiter_storage_uri = app.config.get('REDIS_URL') or "memory://"
+if limiter_storage_uri.startswith('unix://'):
+    limiter_storage_uri = 'redis+' + limiter_storage_uri  # limits' name for Redis over a unix socket
 limiter = Limiter(
     key_func=get_remote_address,
     app=app,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri=limiter_storage_uri,
+    storage_options={'socket_timeout': 1} if app.config.get('REDIS_URL') else {},
+    strategy="moving-window",
+    key_prefix="rl",
+    in_memory_fallback_enabled=bool(app.config.get('REDIS_URL')),
 )
 
 
 # Static file cache headers (1 week for assets)
 @app.after_request
 def add_cache_headers(response):
+    # Uploads have random, never-reused filenames, so browsers can keep them forever
+    if request.path.startswith('/static/uploads/'):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'  # 1 year
     # Cache static files (CSS, JS, images) for 1 week
-    if request.path.startswith('/static/'):
+    elif request.path.startswith('/static/'):
         response.headers['Cache-Control'] = 'public, max-age=604800'  # 1 week
     return response
 
+
+# Dev query counter: in debug mode, log "METHOD path -> N queries, T ms" for every request
+# so N+1 regressions show up in logs/app.log
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_request_queries(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_count' in g:
+        g.query_count += 1
+
+
+@app.before_request
+def start_query_counter():
+    if app.debug:
+        g.query_count = 0
+        g.request_started = time.perf_counter()
+
+
+@app.after_request
+def log_query_count(response):
+    if 'query_count' in g:
+        elapsed_ms = (time.perf_counter() - g.request_started) * 1000
+        app.logger.info('%s %s -> %d queries, %.1f ms', request.method, request.path, g.query_count, elapsed_ms)
+    return response
+
 # Logging Configuration
 if not os.path.exists('logs'):
     os.makedirs('logs')
 
+
+class FastRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that only does the exists/isfile stat checks when a record would
+    actually reach maxBytes, instead of on every emit (the CPython 3.11 behaviour)"""
+
+    def shouldRollover(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes > 0:
+            self.stream.seek(0, 2)
+            if self.stream.tell() + len("%s\n" % self.format(record)) >= self.maxBytes:
+                return super().shouldRollover(record)
+        return False
+
+
+def queued_handler(handler):
+    """Return a QueueHandler whose records a background thread writes to `handler`,
+    so file writes and rollover checks stay off request threads"""
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    # Threads don't survive fork (gunicorn --preload): drain before forking, restart on both sides
+    os.register_at_fork(before=listener.stop, after_in_parent=listener.start, after_in_child=listener.start)
+    atexit.register(listener.stop)
+    return QueueHandler(log_queue)
+
+
 # Security audit log
-security_handler = RotatingFileHandler('logs/security.log', maxBytes=10240000, backupCount=10)
+security_handler = FastRotatingFileHandler('logs/security.log', maxBytes=10240000, backupCount=10)
 security_handler.setFormatter(logging.Formatter(
     '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
 ))
@@ -56,15 +146,15 @@ security_handler.setLevel(logging.INFO)
 
 security_logger = logging.getLogger('security')
 security_logger.setLevel(logging.INFO)
-security_logger.addHandler(security_handler)
+security_logger.addHandler(queued_handler(security_handler))
 
 # Application log
-app_handler = RotatingFileHandler('logs/app.log', maxBytes=10240000, backupCount=10)
+app_handler = FastRotatingFileHandler('logs/app.log', maxBytes=10240000, backupCount=10)
 app_handler.setFormatter(logging.Formatter(
     '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
 ))
 app_handler.setLevel(logging.INFO)
-app.logger.addHandler(app_handler)
+app.logger.addHandler(queued_handler(app_handler))
 app.logger.setLevel(logging.INFO)
 app.logger.info('BP Badminton startup')
 
@@ -73,6 +163,7 @@ UPLOAD_FOLDER = os.path.join(app.root_path, 'static', 'uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # 5MB max
+PROFILE_PHOTO_SIZE = (288, 288)  # Largest avatar is 96px (w-24), so this covers 3x screens; stored as WebP
 
 # Ensure upload folder exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -81,22 +172,86 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def save_profile_photo(file):
-    """Save uploaded profile photo and return filename"""
+    """Downscale uploaded profile photo, save it as WebP and return filename (None if not a valid image)"""
     if file and allowed_file(file.filename):
-        # Generate unique filename
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        filename = f"{uuid.uuid4().hex}.{ext}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        try:
+            img = Image.open(file.stream)
+            img.draft('RGB', PROFILE_PHOTO_SIZE)  # JPEGs decode straight at a reduced scale
+            img = ImageOps.exif_transpose(img)  # Keep phone photos upright once EXIF is dropped
+            img.thumbnail(PROFILE_PHOTO_SIZE)
+            img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+            return None
+        # Generate unique filename; write to a temp file and rename so a half-written photo is never served
+        filename = f"{uuid.uuid4().hex}.webp"
+        with tempfile.NamedTemporaryFile(dir=app.config['UPLOAD_FOLDER'], suffix='.tmp', delete=False) as tmp:
+            try:
+                img.save(tmp, 'WEBP', quality=80, method=6)
+            except Exception:
+                os.unlink(tmp.name)
+                raise
+        os.replace(tmp.name, os.path.join(app.config['UPLOAD_FOLDER'], filename))
         return filename
     return None
 
+def remove_profile_photo(filename):
+    """Delete a replaced profile photo (call after the commit that stops referencing it)"""
+    if filename:
+        try:
+            os.unlink(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+        except FileNotFoundError:
+            pass
+
 db.init_app(app)
 migrate = Migrate(app, db)
 
-# Create tables
-with app.app_context():
+# Create tables: `flask init-db`, or FLASK_INIT_DB=1 / `python app.py` locally. Not on every import -
+# start.sh creates or migrates the schema once before gunicorn forks its workers
+@app.cli.command('init-db')
+def init_db_command():
+    """Create any missing tables"""
     db.create_all()
+    print('Database tables created.')
+
+
+if os.environ.get('FLASK_INIT_DB') == '1':
+    with app.app_context():
+        db.create_all()
+
+
+# Submitted-value parsing: malformed form/JSON input is answered as a 400, never a 500
+class InvalidInput(BadRequest):
+    """A submitted form field or JSON value is missing or malformed"""
+
+
+REQUIRED = object()  # parse_input default for fields that must be present
+
+
+def parse_input(value, convert, field, default=REQUIRED):
+    """Convert a submitted value with convert (int, float, date.fromisoformat, ...).
+    Blank values give default (InvalidInput if the field is required), malformed ones raise InvalidInput."""
+    if value is None or value == '':
+        if default is REQUIRED:
+            raise InvalidInput(f'{field} is required')
+        return default
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        raise InvalidInput(f'Invalid {field}: {value}')
+
+
+@lru_cache(maxsize=512)
+def month_label(ym):
+    """'YYYY-MM' -> 'January 2026' (there are only a few hundred distinct months, so cache them)"""
+    return date(int(ym[:4]), int(ym[5:7]), 1).strftime('%B %Y')
+
+
+@app.errorhandler(InvalidInput)
+def invalid_input_handler(e):
+    if request.is_json or request.path.startswith('/api/'):
+        return jsonify({'error': e.description}), 400
+    flash(e.description, 'error')
+    return redirect(request.referrer or url_for('dashboard'))
 
 
 # Authentication decorator
@@ -122,19 +277,67 @@ def admin_required(f):
     return decorated_function
 
 
+def balance_loaders():
+    """Loader options for pages showing player charges/payments/balance (avoids per-player lazy loads)"""
+    # Session.attendances is spelled out: default eager loaders stop at the attendance->session->attendances cycle
+    return [
+        selectinload(Player.payments),
+        selectinload(Player.attendances).selectinload(Attendance.session).selectinload(Session.attendances)
+    ]
+
+
+def debug_raiseload():
+    """In debug mode, make undeclared lazy loads raise so N+1s from templates show up in development"""
+    return [raiseload('*')] if app.debug else []
+
+
 # Cached helper for monthly summary (expensive calculation)
 @cache.memoize(timeout=60)  # Cache for 60 seconds
 def get_cached_monthly_summary():
     """Calculate monthly summary with caching"""
-    all_sessions = Session.query.order_by(Session.date.desc()).all()
-    monthly_summary = {}
-    for sess in all_sessions:
-        key = sess.date.strftime('%Y-%m')
-        label = sess.date.strftime('%B %Y')
-        if key not in monthly_summary:
-            monthly_summary[key] = {
-                'label': label,
-                'sessions': [],
+    # Same figures as the Session get_*_charges/get_total_collection/get_total_refunds methods: player
+    # counts and refunds per session come from SQL, costs and rounding from per_player_costs()/round_cents()
+    counted = Attendance.status.in_(['YES', 'DROPOUT'])
+    charged = Attendance.status.in_(['YES', 'DROPOUT', 'FILLIN'])
+    is_other = db.or_(Attendance.category.is_(None), Attendance.category.notin_(['kid', 'adhoc']))
+    att = db.session.query(
+        Attendance.session_id.label('session_id'),
+        func.count(Attendance.id).filter(counted, Attendance.category == 'regular').label('regular'),
+        func.count(Attendance.id).filter(counted, Attendance.category == 'adhoc').label('adhoc'),
+        func.count(Attendance.id).filter(counted, Attendance.category == 'kid').label('kids'),
+        # Collection charges fill-ins too, and anything not kid/adhoc at the regular rate
+        func.count(Attendance.id).filter(charged, is_other).label('charged_regular'),
+        func.count(Attendance.id).filter(charged, Attendance.category == 'adhoc').label('charged_adhoc'),
+        func.count(Attendance.id).filter(charged, Attendance.category == 'kid').label('charged_kids')
+    ).group_by(Attendance.session_id).subquery()
+    refunds = db.session.query(
+        DropoutRefund.session_id.label('session_id'),
+        func.sum(DropoutRefund.refund_amount).label('total')
+    ).filter(DropoutRefund.status == 'processed').group_by(DropoutRefund.session_id).subquery()
+
+    def n(column):
+        return func.coalesce(column, 0)
+
+    sessions = db.session.query(
+        Session.id,
+        year_month(Session.date).label('ym'),
+        Session.is_archived,
+        Session.birdie_cost,
+        *[n(att.c[name]).label(name) for name in
+          ['regular', 'adhoc', 'kids', 'charged_regular', 'charged_adhoc', 'charged_kids']],
+        n(refunds.c.total).label('total_refunds')
+    ).outerjoin(att, att.c.session_id == Session.id).outerjoin(
+        refunds, refunds.c.session_id == Session.id
+    ).order_by(Session.date.desc()).all()
+    costs = Session.per_player_costs()
+
+    monthly = {}
+    for row in sessions:
+        cost = costs[row.id]
+        summary = monthly.get(row.ym)
+        if summary is None:
+            summary = monthly[row.ym] = {
+                'label': month_label(row.ym),
                 'total_sessions': 0,
                 'archived_sessions': 0,
                 'birdie_charges': 0,
@@ -144,28 +347,150 @@ def get_cached_monthly_summary():
                 'total_refunds': 0,
                 'total_collection': 0
             }
-        monthly_summary[key]['sessions'].append(sess)
-        monthly_summary[key]['total_sessions'] += 1
-        if sess.is_archived:
-            monthly_summary[key]['archived_sessions'] += 1
-        monthly_summary[key]['birdie_charges'] += sess.get_birdie_cost_total()
-        monthly_summary[key]['regular_charges'] += sess.get_regular_player_charges()
-        monthly_summary[key]['adhoc_charges'] += sess.get_adhoc_player_charges()
-        monthly_summary[key]['kid_charges'] += sess.get_kid_player_charges()
-        monthly_summary[key]['total_refunds'] += sess.get_total_refunds()
-        monthly_summary[key]['total_collection'] += sess.get_total_collection()
-
-    for key in monthly_summary:
-        monthly_summary[key]['is_fully_archived'] = (
-            monthly_summary[key]['total_sessions'] == monthly_summary[key]['archived_sessions']
+        summary['total_sessions'] += 1
+        if row.is_archived:
+            summary['archived_sessions'] += 1
+        summary['birdie_charges'] += round_cents(row.birdie_cost * (row.regular + row.adhoc))
+        summary['regular_charges'] += round_cents(cost.regular_cost * row.regular)
+        summary['adhoc_charges'] += round_cents(cost.adhoc_cost * row.adhoc)
+        summary['kid_charges'] += round_cents(11.0 * row.kids)
+        summary['total_refunds'] += row.total_refunds
+        summary['total_collection'] += round_cents(
+            cost.regular_cost * row.charged_regular + cost.adhoc_cost * row.charged_adhoc + 11.0 * row.charged_kids
+        )
+
+    for summary in monthly.values():
+        summary['is_fully_archived'] = summary['total_sessions'] == summary['archived_sessions']
+    return sorted(monthly.items(), reverse=True)
+
+
+# Cached helper for dashboard monthly totals (barely change between page loads)
+@cache.memoize(timeout=30)  # Cache for 30 seconds
+def get_cached_dashboard_totals():
+    """Calculate the dashboard's last-6-months summary and top-card totals with caching"""
+    # Active players' chargeable attendances counted per session and category in SQL; charges use the
+    # per-player costs rounded in Python (kids flat $11, plus additional cost), summed per month
+    costs = Session.per_player_costs()
+    is_other = db.or_(Attendance.category.is_(None), Attendance.category.notin_(['kid', 'adhoc']))
+    session_month = year_month(Session.date)
+    session_rows = db.session.query(
+        session_month.label('ym'),
+        Attendance.session_id,
+        func.count(Attendance.id).label('attendees'),
+        func.count(Attendance.id).filter(Attendance.category == 'kid').label('kids'),
+        func.count(Attendance.id).filter(Attendance.category == 'adhoc').label('adhoc'),
+        func.count(Attendance.id).filter(is_other).label('regular'),
+        func.coalesce(func.sum(Attendance.additional_cost), 0).label('additional')
+    ).select_from(Attendance).join(Session, Session.id == Attendance.session_id).join(
+        Player, Player.id == Attendance.player_id
+    ).filter(
+        Attendance.status.in_(['YES', 'DROPOUT', 'FILLIN']),
+        Player.is_active == True
+    ).group_by(session_month, Attendance.session_id).all()
+    month_charges = defaultdict(float)
+    month_attendees = defaultdict(int)
+    for row in session_rows:
+        cost = costs[row.session_id]
+        month_charges[row.ym] += (
+            11.0 * row.kids + cost.adhoc_cost * row.adhoc + cost.regular_cost * row.regular + row.additional
         )
+        month_attendees[row.ym] += row.attendees
+
+    # Monthly summary: last 6 months that have any session (archived or not), descending
+    month_rows = db.session.query(
+        session_month.label('ym'),
+        func.count(Session.id).label('sessions'),
+        # Month is "active" if it has at least one non-archived session
+        func.count(Session.id).filter(Session.is_archived.isnot(True)).label('active_sessions')
+    ).group_by(session_month).order_by(session_month.desc()).limit(6).all()
+
+    payment_month = year_month(Payment.date)
+    collected_by_month = dict(db.session.query(
+        payment_month,
+        func.sum(Payment.amount)
+    ).filter(payment_month.in_([r.ym for r in month_rows])).group_by(payment_month).all())
+
+    monthly_summary = []
+    for row in month_rows:
+        year, month = map(int, row.ym.split('-'))
+        m_charges = month_charges[row.ym]
+        m_collected = float(collected_by_month.get(row.ym) or 0)
+        monthly_summary.append({
+            'month': date(year, month, 1).strftime('%b %Y'),
+            'is_active': row.active_sessions > 0,
+            'sessions': row.sessions,
+            'attendees': month_attendees[row.ym],
+            'charges': round(m_charges, 2),
+            'collected': round(m_collected, 2),
+            'outstanding': round(m_charges - m_collected, 2),
+        })
+
+    # Top cards: aggregate from active months (charges - collected for those months)
+    total_charges = round(sum(r['charges'] for r in monthly_summary if r['is_active']), 2)
+    total_collected = round(sum(r['collected'] for r in monthly_summary if r['is_active']), 2)
+    total_outstanding = round(sum(r['outstanding'] for r in monthly_summary if r['is_active']), 2)
+
+    return monthly_summary, total_charges, total_collected, total_outstanding
+
+
+# Cached helper for the dashboard's card counts
+@cache.memoize(timeout=30)  # Cache for 30 seconds (also covers upcoming sessions rolling past at midnight)
+def get_cached_dashboard_counts():
+    """Approved players and upcoming sessions counts with caching"""
+    # Flat COUNT scalar subqueries, fetched together in one round trip
+    return tuple(db.session.query(
+        db.session.query(func.count(Player.id)).filter(Player.is_approved == True).scalar_subquery(),
+        db.session.query(func.count(Session.id)).filter(
+            Session.is_archived == False,
+            Session.date >= date.today()
+        ).scalar_subquery()
+    ).one())
+
+
+# Cached rows are plain tuples, not ORM objects: they are pickled into the cache and read back on later requests
+PlayerSummary = namedtuple('PlayerSummary', [
+    'id', 'name', 'category', 'is_active', 'is_approved', 'profile_photo', 'additional_charges', 'admin_comments'
+])
+OutstandingBalance = namedtuple('OutstandingBalance', ['player', 'balance'])
 
-    return sorted(monthly_summary.items(), key=lambda x: x[0], reverse=True)
+
+def player_summary(player):
+    """PlayerSummary tuple of an ORM Player"""
+    return PlayerSummary(*(getattr(player, field) for field in PlayerSummary._fields))
+
+
+# Cached helper for the payments page totals (same invalidation as the dashboard totals)
+@cache.memoize(timeout=45)  # Cache for 45 seconds
+def get_cached_payment_totals():
+    """Total collected and outstanding (PlayerSummary, balance) rows with caching"""
+    total_collected = db.session.query(func.coalesce(func.sum(Payment.amount), 0)).scalar()
+    balances = [OutstandingBalance(player_summary(player), balance) for player, balance in Player.outstanding_balances()]
+    return round(total_collected, 2), balances
 
 
 def clear_session_cache():
     """Clear session-related cache when data changes"""
     cache.delete_memoized(get_cached_monthly_summary)
+    cache.delete_memoized(get_cached_dashboard_totals)
+    cache.delete_memoized(get_cached_dashboard_counts)
+    cache.delete_memoized(get_cached_payment_totals)
+
+
+# Cached player roster: nearly every page lists players, but names/categories rarely change.
+# Only cached in Redis: a per-process SimpleCache entry would outlive clear_player_cache() in the
+# other workers, so players added, approved or renamed there would stay wrong for 5 minutes
+@cache.memoize(timeout=300, unless=lambda: app.config['CACHE_TYPE'] != 'RedisCache')  # Cache for 5 minutes
+def get_cached_player_roster():
+    """All players (as plain PlayerSummary tuples, not ORM objects) ordered by name with caching"""
+    columns = [getattr(Player, field) for field in PlayerSummary._fields]
+    return [PlayerSummary(*row) for row in db.session.query(*columns).order_by(Player.name).all()]
+
+
+def clear_player_cache():
+    """Clear the cached player roster when a player is added, changed or removed"""
+    cache.delete_memoized(get_cached_player_roster)
+    cache.delete_memoized(get_cached_dashboard_counts)  # Approved-player count
+    cache.delete_memoized(get_cached_payment_totals)  # Names and photos of players with balances
 
 
 # Master admin only decorator (for sensitive operations like promoting admins)
@@ -181,6 +506,55 @@ def master_admin_required(f):
     return decorated_function
 
 
+def regenerate_session_id():
+    """Move the session to a new server-side id when privileges change (login/logout), so a session id
+    planted before login can't be reused afterwards (Redis sessions only; cookie sessions carry no id)"""
+    if session_redis is None:
+        return
+    app.session_interface.regenerate(session)
+
+
+def remember_player_session(player_id):
+    """Track a logged-in player's server-side session id so it can be revoked (Redis sessions only)"""
+    if session_redis is None:
+        return
+    key = f'player_sessions:{player_id}'
+    session_redis.sadd(key, session.sid)
+    session_redis.expire(key, app.permanent_session_lifetime)
+
+
+def revoke_player_sessions(player_id):
+    """Log a player out everywhere by deleting their server-side sessions (Redis sessions only)"""
+    if session_redis is None:
+        return
+    key = f'player_sessions:{player_id}'
+    prefix = app.config.get('SESSION_KEY_PREFIX', 'session:')
+    sids = session_redis.smembers(key)
+    if sids:
+        session_redis.delete(*[prefix + sid.decode() for sid in sids])
+    session_redis.delete(key)
+
+
+def check_admin_password(password):
+    """Constant-time comparison with the shared admin password (read each call: it can be reset at runtime)"""
+    return hmac.compare_digest((password or '').encode(), app.config['APP_PASSWORD'].encode())
+
+
+def check_player_password(player, password):
+    """player.check_password, remembering known-wrong guesses so repeating one skips the slow password hash.
+    Keyed on the stored hash too, so a password change never hits a stale entry."""
+    if not player.password_hash or not password:
+        return player.check_password(password)
+    digest = hmac.new(app.config['SECRET_KEY'].encode(), f'{player.password_hash}\0{password}'.encode(), hashlib.sha256)
+    key = f'bad_password:{digest.hexdigest()}'
+    if cache.get(key):
+        return False
+    if player.check_password(password):
+        return True
+    cache.set(key, True, timeout=900)  # 15 minutes
+    return False
+
+
 # Auth routes
 @app.route('/login', methods=['GET', 'POST'])
 @limiter.limit("10 per minute")  # Rate limit: 10 login attempts per minute
@@ -191,9 +565,10 @@ def login():
 
         if login_type == 'admin':
             password = request.form.get('password')
-            if password == app.config['APP_PASSWORD']:
+            if check_admin_password(password):
                 session['authenticated'] = True
                 session['user_type'] = 'admin'
+                regenerate_session_id()
                 security_logger.info(f'ADMIN_LOGIN_SUCCESS - IP: {client_ip}')
                 flash('Successfully logged in as admin!', 'success')
                 return redirect(url_for('dashboard'))
@@ -203,8 +578,8 @@ def login():
             # Player login
             email = request.form.get('email', '').strip().lower()
             password = request.form.get('player_password')
-            player = Player.query.filter(db.func.lower(Player.email) == email).first()
-            if player and player.check_password(password):
+            player = Player.query.filter_by(email=email).first()  # Emails are stored lowercased
+            if player and check_player_password(player, password):
                 if not player.is_approved:
                     security_logger.info(f'LOGIN_PENDING_APPROVAL - Email: {email}, IP: {client_ip}')
                     flash('Your registration is pending approval. Please wait for admin approval.', 'error')
@@ -219,6 +594,8 @@ def login():
                                            booking_guidelines=SiteSettings.get('booking_guidelines', ''))
                 session['authenticated'] = True
                 session['player_id'] = player.id
+                regenerate_session_id()
+                remember_player_session(player.id)
                 if player.is_admin:
                     session['user_type'] = 'player_admin'
                     security_logger.info(f'PLAYER_ADMIN_LOGIN_SUCCESS - Player: {player.name} (ID: {player.id}), IP: {client_ip}')
@@ -239,9 +616,8 @@ def login():
 
 @app.route('/logout')
 def logout():
-    session.pop('authenticated', None)
-    session.pop('user_type', None)
-    session.pop('player_id', None)
+    regenerate_session_id()
+    session.clear()
     flash('Logged out successfully', 'success')
     return redirect(url_for('login'))
 
@@ -277,7 +653,7 @@ def register():
                                booking_guidelines=SiteSettings.get('booking_guidelines', ''))
 
         # Check if email already exists
-        existing_player = Player.query.filter(db.func.lower(Player.email) == email).first()
+        existing_player = Player.query.filter_by(email=email).first()
         if existing_player:
             security_logger.warning(f'REGISTRATION_DUPLICATE_EMAIL - Email: {email}, IP: {client_ip}')
             flash('An account with this email already exists. Please contact an admin to reset your password.', 'error')
@@ -298,6 +674,7 @@ def register():
 
         db.session.add(player)
         db.session.commit()
+        clear_player_cache()
 
         security_logger.info(f'REGISTRATION_SUCCESS - Name: {name}, Email: {email}, IP: {client_ip}')
         flash('Registration successful! Please wait for admin approval.', 'success')
@@ -358,63 +735,8 @@ def dashboard():
         return redirect(url_for('player_profile'))
     # Admin and player_admin can access dashboard
 
-    total_players = Player.query.filter_by(is_approved=True).count()
-    upcoming_sessions = Session.query.filter(
-        Session.is_archived == False,
-        Session.date >= date.today()
-    ).count()
-
-    # Monthly summary: last 6 months that have any session (archived or not), descending
-    all_sessions_for_summary = Session.query.all()
-    session_months = sorted(
-        {(s.date.year, s.date.month) for s in all_sessions_for_summary},
-        reverse=True
-    )[:6]
-
-    monthly_summary = []
-    for year, month in session_months:
-        month_start = date(year, month, 1)
-        month_end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
-
-        m_sessions = [s for s in all_sessions_for_summary
-                      if month_start <= s.date < month_end]
-        # Month is "active" if it has at least one non-archived session
-        is_active_month = any(not s.is_archived for s in m_sessions)
-
-        m_charges = 0
-        m_attendees = 0
-        for sess in m_sessions:
-            for att in sess.attendances:
-                if att.status in ['YES', 'DROPOUT', 'FILLIN'] and att.player and att.player.is_active:
-                    m_attendees += 1
-                    if att.category == 'kid':
-                        m_charges += sess.get_cost_per_kid()
-                    elif att.category == 'adhoc':
-                        m_charges += sess.get_cost_per_adhoc_player()
-                    else:
-                        m_charges += sess.get_cost_per_regular_player()
-                    m_charges += (att.additional_cost or 0)
-
-        m_payments = Payment.query.filter(
-            Payment.date >= datetime.combine(month_start, datetime.min.time()),
-            Payment.date < datetime.combine(month_end, datetime.min.time())
-        ).all()
-        m_collected = sum(p.amount for p in m_payments)
-
-        monthly_summary.append({
-            'month': month_start.strftime('%b %Y'),
-            'is_active': is_active_month,
-            'sessions': len(m_sessions),
-            'attendees': m_attendees,
-            'charges': round(m_charges, 2),
-            'collected': round(m_collected, 2),
-            'outstanding': round(m_charges - m_collected, 2),
-        })
-
-    # Top cards: aggregate from active months (charges - collected for those months)
-    total_collected = round(sum(r['collected'] for r in monthly_summary if r['is_active']), 2)
-    total_charges = round(sum(r['charges'] for r in monthly_summary if r['is_active']), 2)
-    total_outstanding = round(sum(r['outstanding'] for r in monthly_summary if r['is_active']), 2)
+    total_players, upcoming_sessions = get_cached_dashboard_counts()
+    monthly_summary, total_charges, total_collected, total_outstanding = get_cached_dashboard_totals()
 
     # Pending approvals
     pending_approvals = Player.query.filter_by(is_approved=False).order_by(Player.created_at.desc()).all()
@@ -424,7 +746,7 @@ def dashboard():
                          upcoming_sessions=upcoming_sessions,
                          total_outstanding=total_outstanding,
                          total_collected=total_collected,
-                         total_charges=round(total_charges, 2),
+                         total_charges=total_charges,
                          pending_approvals=pending_approvals,
                          monthly_summary=monthly_summary)
 
@@ -453,7 +775,7 @@ def player_profile():
                 # Check if email is taken by another player
                 if email:
                     existing = Player.query.filter(
-                        db.func.lower(Player.email) == email,
+                        Player.email == email,
                         Player.id != player.id
                     ).first()
                     if existing:
@@ -464,6 +786,8 @@ def player_profile():
                 player.email = email if email else None
                 player.phone = phone if phone else None
                 db.session.commit()
+                clear_session_cache()  # Invalidate cached payment totals (player name/photo shown there)
+                clear_player_cache()
                 flash('Profile updated successfully!', 'success')
 
         elif action == 'update_zelle':
@@ -478,7 +802,7 @@ def player_profile():
             new_password = request.form.get('new_password')
             confirm_password = request.form.get('confirm_password')
 
-            if not player.check_password(current_password):
+            if not check_player_password(player, current_password):
                 flash('Current password is incorrect', 'error')
             elif new_password != confirm_password:
                 flash('New passwords do not match', 'error')
@@ -493,15 +817,14 @@ def player_profile():
             if 'profile_photo' in request.files:
                 file = request.files['profile_photo']
                 if file and file.filename:
-                    # Delete old photo if exists
-                    if player.profile_photo:
-                        old_path = os.path.join(app.config['UPLOAD_FOLDER'], player.profile_photo)
-                        if os.path.exists(old_path):
-                            os.remove(old_path)
                     filename = save_profile_photo(file)
                     if filename:
+                        old_photo = player.profile_photo
                         player.profile_photo = filename
                         db.session.commit()
+                        remove_profile_photo(old_photo)
+                        clear_session_cache()  # Invalidate cached payment totals (player photo shown there)
+                        clear_player_cache()
                         flash('Profile photo updated!', 'success')
                     else:
                         flash('Invalid file type. Please upload an image (PNG, JPG, GIF, WEBP).', 'error')
@@ -509,13 +832,44 @@ def player_profile():
         return redirect(url_for('player_profile'))
 
     # Get attendance history
-    attendances = player.attendances.join(Session).order_by(Session.date.desc()).all()
-    payments = player.payments.order_by(Payment.date.desc()).all()
+    attendances = Attendance.query.join(Session).options(
+        contains_eager(Attendance.session).options(selectinload(Session.attendances), selectinload(Session.courts)),
+        *debug_raiseload()
+    ).filter(
+        Attendance.player_id == player.id
+    ).order_by(Session.date.desc()).all()
+    # The balance figures iterate player.attendances - reuse the rows just loaded instead of querying again
+    set_committed_value(player, 'attendances', attendances)
+    payments = player.payments
 
     return render_template('player_profile.html', player=player, attendances=attendances, payments=payments)
 
 
 # Player sessions view - see all sessions and vote
+def archived_month_sessions(ym):
+    """Archived sessions in the 'YYYY-MM' month ym, newest first (attendances via selectin)"""
+    # Date range rather than year_month(date) == ym so the (is_archived, date) index applies
+    month_start = datetime.strptime(ym, '%Y-%m').date()
+    next_month = date(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+    return Session.query.filter(
+        Session.is_archived == True, Session.date >= month_start, Session.date < next_month
+    ).order_by(Session.date.desc()).all()
+
+
+def build_attendance_maps(sessions, player_ids):
+    """Bucket the sessions' loaded attendances into attendance_map {player_id: {session_id: status}}
+    for the given players and session_attendance {session_id: {player_id: status}} for everyone"""
+    attendance_map = {pid: {} for pid in player_ids}
+    session_attendance = defaultdict(dict)
+    for sess in sessions:
+        statuses = session_attendance[sess.id]
+        for att in sess.attendances:
+            statuses[att.player_id] = att.status
+            if att.player_id in attendance_map:
+                attendance_map[att.player_id][sess.id] = att.status
+    return attendance_map, session_attendance
+
+
 @app.route('/player/sessions')
 @login_required
 def player_sessions():
@@ -531,61 +885,37 @@ def player_sessions():
     # Get today's date for splitting sessions
     today = date.today()
 
-    # Get upcoming sessions (not archived, date >= today)
-    upcoming_sessions = Session.query.filter(
-        Session.is_archived == False,
-        Session.date >= today
-    ).order_by(Session.date.asc()).all()
-
-    # Get past sessions (not archived, date < today) - these are completed but not yet archived
-    past_sessions = Session.query.filter(
-        Session.is_archived == False,
-        Session.date < today
-    ).order_by(Session.date.desc()).all()
-
-    # Get archived sessions grouped by year-month
-    archived_sessions = Session.query.filter_by(is_archived=True).order_by(Session.date.desc()).all()
-
-    # Group archived by year-month
-    archived_grouped = {}
-    for sess in archived_sessions:
-        key = sess.date.strftime('%Y-%m')
-        label = sess.date.strftime('%B %Y')
-        if key not in archived_grouped:
-            archived_grouped[key] = {'label': label, 'sessions': []}
-        archived_grouped[key]['sessions'].append(sess)
-
-    # Sort by key (year-month) descending
-    archived_sorted = sorted(archived_grouped.items(), key=lambda x: x[0], reverse=True)
+    # Upcoming (date >= today) and past (date < today - completed but not yet archived) sessions
+    # in one query (attendances come with them via selectin), split in Python
+    active_sessions = Session.query.filter(Session.is_archived == False).order_by(Session.date.desc()).all()
+    upcoming_sessions = [s for s in reversed(active_sessions) if s.date >= today]
+    past_sessions = [s for s in active_sessions if s.date < today]
+
+    # Archived sessions: month keys and counts come from SQL; only the newest month's sessions
+    # are loaded here, older months are fetched when expanded (player_archived_month)
+    archive_month = year_month(Session.date)
+    month_rows = db.session.query(archive_month.label('ym'), func.count(Session.id)).filter(
+        Session.is_archived == True
+    ).group_by(archive_month).order_by(archive_month.desc()).all()
+    archived_sorted = [
+        (key, {'label': month_label(key), 'count': count, 'sessions': None})
+        for key, count in month_rows
+    ]
+    archived_sessions = []
+    if archived_sorted:
+        archived_sessions = archived_month_sessions(archived_sorted[0][0])
+        archived_sorted[0][1]['sessions'] = archived_sessions
+
+    # Get all players for showing attendance (cached plain tuples, no ORM hydration)
+    all_players = get_cached_player_roster()
 
-    # Get attendance map for this player and managed players
-    attendance_map = {}  # {player_id: {session_id: status}}
     players_to_track = [player] + list(managed_players)
-    for p in players_to_track:
-        attendance_map[p.id] = {}
-        for att in Attendance.query.filter_by(player_id=p.id).all():
-            attendance_map[p.id][att.session_id] = att.status
-
-    # Get all players for showing attendance
-    all_players = Player.query.order_by(Player.name).all()
-
-    # Get all attendance records for sessions we're displaying
-    all_sessions = upcoming_sessions + past_sessions + archived_sessions
-    session_attendance = {}  # {session_id: {player_id: status}}
-    for sess in all_sessions:
-        session_attendance[sess.id] = {}
-        for att in sess.attendances.all():
-            session_attendance[sess.id][att.player_id] = att.status
-
-    # Ensure current player and managed players have attendance records for upcoming sessions
-    for sess in upcoming_sessions + past_sessions:
-        for p in players_to_track:
-            if sess.id not in attendance_map[p.id]:
-                attendance = Attendance(player_id=p.id, session_id=sess.id, status='NO')
-                db.session.add(attendance)
-                attendance_map[p.id][sess.id] = 'NO'
-                session_attendance[sess.id][p.id] = 'NO'
-    db.session.commit()
+    attendance_map, session_attendance = build_attendance_maps(
+        active_sessions + archived_sessions, [p.id for p in players_to_track]
+    )
+
+    # No backfill here: a missing attendance row means 'NO' (templates default to it) and
+    # voting upserts the row, so this GET handler stays read-only
 
     return render_template('player_sessions.html',
                          player=player,
@@ -598,6 +928,28 @@ def player_sessions():
                          session_attendance=session_attendance)
 
 
+@app.route('/player/sessions/archive/<ym>')
+@login_required
+def player_archived_month(ym):
+    """Sessions list for one archived month, loaded when the month is expanded on player_sessions"""
+    if session.get('user_type') != 'player':
+        abort(403)
+    player = Player.query.get_or_404(session.get('player_id'))
+    try:
+        sessions_in_month = archived_month_sessions(ym)
+    except ValueError:
+        abort(404)  # Not a YYYY-MM month
+    all_players = get_cached_player_roster()
+    attendance_map, session_attendance = build_attendance_maps(sessions_in_month, [player.id])
+
+    return render_template('partials/archived_sessions.html',
+                         player=player,
+                         sessions=sessions_in_month,
+                         attendance_map=attendance_map,
+                         all_players=all_players,
+                         session_attendance=session_attendance)
+
+
 # Player payment - players can record their own and managed players' payments
 @app.route('/player/payments', methods=['GET', 'POST'])
 @login_required
@@ -606,12 +958,15 @@ def player_payments():
         return redirect(url_for('payments'))
 
     player_id = session.get('player_id')
-    player = Player.query.get_or_404(player_id)
+    # Balances are shown for the player and each managed player: load all their attendances/payments up front
+    player = Player.query.options(
+        *balance_loaders(), selectinload(Player.managed_players).options(*balance_loaders())
+    ).filter_by(id=player_id).first_or_404()
     managed_players = player.managed_players
 
     if request.method == 'POST':
-        target_player_id = int(request.form.get('player_id', player_id))
-        amount = float(request.form.get('amount'))
+        target_player_id = parse_input(request.form.get('player_id'), int, 'player', default=player_id)
+        amount = parse_input(request.form.get('amount'), float, 'amount')
         method = request.form.get('method')
         date_str = request.form.get('date')
         notes = request.form.get('notes')
@@ -622,7 +977,7 @@ def player_payments():
             flash('You can only record payments for yourself or managed players', 'error')
             return redirect(url_for('player_payments'))
 
-        payment_date = datetime.strptime(date_str, '%Y-%m-%d') if date_str else datetime.utcnow()
+        payment_date = parse_input(date_str, datetime.fromisoformat, 'date', default=None) or datetime.utcnow()
 
         payment = Payment(
             player_id=target_player_id,
@@ -633,6 +988,7 @@ def player_payments():
         )
         db.session.add(payment)
         db.session.commit()
+        clear_session_cache()  # Invalidate cached dashboard totals
 
         target_player = Player.query.get(target_player_id)
         flash(f'Payment of ${amount:.2f} for {target_player.name} recorded successfully!', 'success')
@@ -658,15 +1014,14 @@ def update_player_attendance():
         return jsonify({'error': 'Player access only'}), 403
 
     current_player_id = session.get('player_id')
-    current_player = Player.query.get(current_player_id)
     data = request.get_json()
     session_id = data.get('session_id')
     status = data.get('status')
     target_player_id = data.get('player_id', current_player_id)  # Default to self
 
-    # Check if voting is frozen for this session
-    sess = Session.query.get(session_id)
-    if sess and sess.voting_frozen:
+    # Check if voting is frozen for this session (only the flag is needed, not the session and its attendances)
+    voting_frozen = db.session.query(Session.voting_frozen).filter_by(id=session_id).scalar()
+    if voting_frozen:
         return jsonify({'error': 'Voting is frozen for this session'}), 403
 
     # Players can only use YES, NO, TENTATIVE (DROPOUT and FILLIN are admin-only)
@@ -674,26 +1029,21 @@ def update_player_attendance():
         return jsonify({'error': 'Invalid status'}), 400
 
     # Check if target player is self or a managed player
-    managed_player_ids = [p.id for p in current_player.managed_players]
-    if target_player_id != current_player_id and target_player_id not in managed_player_ids:
-        return jsonify({'error': 'You can only vote for yourself or your managed players'}), 403
-
-    attendance = Attendance.query.filter_by(player_id=target_player_id, session_id=session_id).first()
-
-    if attendance:
-        attendance.status = status
-    else:
-        attendance = Attendance(player_id=target_player_id, session_id=session_id, status=status)
-        db.session.add(attendance)
+    if target_player_id != current_player_id:
+        is_managed = db.session.query(Player.id).filter_by(id=target_player_id, managed_by=current_player_id).first()
+        if not is_managed:
+            return jsonify({'error': 'You can only vote for yourself or your managed players'}), 403
 
+    Attendance.upsert(target_player_id, session_id, {'status': status})
     db.session.commit()
+    clear_session_cache()  # Invalidate cached dashboard totals
 
     # Return updated session info
-    sess = Session.query.get(session_id)
+    attendee_count, cost_per_player = Session.attendee_stats(session_id)
     return jsonify({
         'success': True,
-        'attendee_count': sess.get_attendee_count(),
-        'cost_per_player': sess.get_cost_per_player()
+        'attendee_count': attendee_count,
+        'cost_per_player': cost_per_player
     })
 
 
@@ -736,28 +1086,32 @@ def bulk_update_player_attendance():
             continue
 
         # Update or create attendance
-        attendance = Attendance.query.filter_by(player_id=target_player_id, session_id=session_id).first()
-        if attendance:
-            attendance.status = status
-        else:
-            attendance = Attendance(player_id=target_player_id, session_id=session_id, status=status)
-            db.session.add(attendance)
+        Attendance.upsert(target_player_id, session_id, {'status': status})
 
         updated_count += 1
 
     db.session.commit()
+    clear_session_cache()  # Invalidate cached dashboard totals
     return jsonify({'success': True, 'updated_count': updated_count})
 
 
 # Player routes
+PLAYERS_PAGE_SIZE = 50  # Players shown per page on the players list
+
+
 @app.route('/players')
 @admin_required
 def players():
     category = request.args.get('category', 'all')
     search_query = request.args.get('search', '').strip()
 
-    # Start with base query
-    query = Player.query
+    # Start with base query (balances in the table iterate each player's attendances and payments);
+    # only the columns the table shows are loaded (no password hashes, notes, audit fields)
+    query = Player.query.options(
+        load_only(Player.id, Player.name, Player.category, Player.phone, Player.email, Player.profile_photo,
+                  Player.is_active, Player.is_approved, Player.is_admin),
+        *balance_loaders()
+    )
 
     # Apply category filter
     if category != 'all':
@@ -774,8 +1128,28 @@ def players():
             )
         )
 
-    player_list = query.order_by(Player.name).all()
-    return render_template('players.html', players=player_list, current_category=category, search_query=search_query)
+    # Keyset pagination on (name, id): ?after=<name>&after_id=<id> continues after that row.
+    # The grouped "all" view groups each page by category
+    after_name = request.args.get('after')
+    if after_name is not None:
+        after_id = request.args.get('after_id', 0, type=int)
+        query = query.filter(db.or_(
+            Player.name > after_name,
+            db.and_(Player.name == after_name, Player.id > after_id)
+        ))
+    player_list = query.order_by(Player.name, Player.id).limit(PLAYERS_PAGE_SIZE + 1).all()
+    next_player = None
+    if len(player_list) > PLAYERS_PAGE_SIZE:
+        player_list = player_list[:PLAYERS_PAGE_SIZE]
+        next_player = player_list[-1]
+
+    # Whole-roster counts for the grouped view headers
+    category_counts = {}
+    if category == 'all' and not search_query:
+        category_counts = dict(db.session.query(Player.category, func.count(Player.id)).group_by(Player.category).all())
+
+    return render_template('players.html', players=player_list, current_category=category, search_query=search_query,
+                         next_player=next_player, is_paged=after_name is not None, category_counts=category_counts)
 
 
 @app.route('/players/add', methods=['GET', 'POST'])
@@ -785,7 +1159,7 @@ def add_player():
         name = request.form.get('name')
         category = request.form.get('category', 'regular')
         phone = request.form.get('phone')
-        email = request.form.get('email')
+        email = request.form.get('email', '').strip().lower() or None  # Stored lowercased for login lookups
         password = request.form.get('password')
         zelle_preference = request.form.get('zelle_preference', 'email')
         gender = request.form.get('gender', 'male')
@@ -798,16 +1172,13 @@ def add_player():
         player = Player(name=name, category=category, phone=phone, email=email, zelle_preference=zelle_preference, gender=gender, is_approved=True)
 
         # Handle date of birth
-        if dob_str:
-            player.date_of_birth = datetime.strptime(dob_str, '%Y-%m-%d').date()
+        player.date_of_birth = parse_input(dob_str, date.fromisoformat, 'date of birth', default=None)
 
         if password:
             player.set_password(password)
 
         # Handle managed_by
-        managed_by = request.form.get('managed_by')
-        if managed_by:
-            player.managed_by = int(managed_by)
+        player.managed_by = parse_input(request.form.get('managed_by'), int, 'manager', default=None)
 
         # Handle profile photo upload
         if 'profile_photo' in request.files:
@@ -819,10 +1190,11 @@ def add_player():
 
         db.session.add(player)
         db.session.commit()
+        clear_player_cache()
         flash(f'Player {name} added successfully!', 'success')
         return redirect(url_for('players'))
 
-    all_players = Player.query.order_by(Player.name).all()
+    all_players = get_cached_player_roster()  # Manager dropdown
     return render_template('player_form.html', player=None, all_players=all_players)
 
 
@@ -830,8 +1202,15 @@ def add_player():
 @admin_required
 def player_detail(id):
     player = Player.query.get_or_404(id)
-    attendances = player.attendances.join(Session).order_by(Session.date.desc()).all()
-    payments = player.payments.order_by(Payment.date.desc()).all()
+    attendances = Attendance.query.join(Session).options(
+        contains_eager(Attendance.session).options(selectinload(Session.attendances), selectinload(Session.courts)),
+        *debug_raiseload()
+    ).filter(
+        Attendance.player_id == player.id
+    ).order_by(Session.date.desc()).all()
+    # The balance figures iterate player.attendances - reuse the rows just loaded instead of querying again
+    set_committed_value(player, 'attendances', attendances)
+    payments = player.payments
     return render_template('player_detail.html', player=player, attendances=attendances, payments=payments)
 
 
@@ -844,38 +1223,37 @@ def edit_player(id):
         player.name = request.form.get('name')
         player.category = request.form.get('category', 'regular')
         player.phone = request.form.get('phone')
-        player.email = request.form.get('email')
+        player.email = request.form.get('email', '').strip().lower() or None
         player.zelle_preference = request.form.get('zelle_preference', 'email')
         player.gender = request.form.get('gender', 'male')
         dob_str = request.form.get('date_of_birth')
-        player.date_of_birth = datetime.strptime(dob_str, '%Y-%m-%d').date() if dob_str else None
+        player.date_of_birth = parse_input(dob_str, date.fromisoformat, 'date of birth', default=None)
 
         password = request.form.get('password')
         if password:
             player.set_password(password)
 
         # Handle managed_by
-        managed_by = request.form.get('managed_by')
-        player.managed_by = int(managed_by) if managed_by else None
+        player.managed_by = parse_input(request.form.get('managed_by'), int, 'manager', default=None)
 
-        # Handle profile photo upload
+        # Handle profile photo upload (the old photo is deleted once the commit no longer references it)
+        old_photo = None
         if 'profile_photo' in request.files:
             file = request.files['profile_photo']
             if file and file.filename:
-                # Delete old photo if exists
-                if player.profile_photo:
-                    old_path = os.path.join(app.config['UPLOAD_FOLDER'], player.profile_photo)
-                    if os.path.exists(old_path):
-                        os.remove(old_path)
                 filename = save_profile_photo(file)
                 if filename:
+                    old_photo = player.profile_photo
                     player.profile_photo = filename
 
         db.session.commit()
+        remove_profile_photo(old_photo)
+        clear_session_cache()  # Invalidate cached payment totals (player name/photo shown there)
+        clear_player_cache()
         flash(f'Player {player.name} updated successfully!', 'success')
         return redirect(url_for('player_detail', id=id))
 
-    all_players = Player.query.order_by(Player.name).all()
+    all_players = get_cached_player_roster()  # Manager dropdown
     return render_template('player_form.html', player=player, all_players=all_players)
 
 
@@ -884,8 +1262,12 @@ def edit_player(id):
 def delete_player(id):
     player = Player.query.get_or_404(id)
     name = player.name
+    photo = player.profile_photo
     db.session.delete(player)
     db.session.commit()
+    remove_profile_photo(photo)
+    clear_session_cache()  # Invalidate cached dashboard totals
+    clear_player_cache()
     flash(f'Player {name} deleted successfully!', 'success')
     return redirect(url_for('players'))
 
@@ -893,11 +1275,17 @@ def delete_player(id):
 @app.route('/players/<int:id>/toggle-admin', methods=['POST'])
 @admin_required
 def toggle_admin(id):
-    player = Player.query.get_or_404(id)
-    player.is_admin = not player.is_admin
+    # Flip the flag and read back the new value and name in one UPDATE ... RETURNING
+    row = db.session.execute(
+        db.update(Player).where(Player.id == id).values(
+            is_admin=db.not_(db.func.coalesce(Player.is_admin, False))
+        ).returning(Player.is_admin, Player.name)
+    ).first()
+    if row is None:
+        abort(404)
     db.session.commit()
-    status = 'promoted to admin' if player.is_admin else 'removed from admin'
-    flash(f'{player.name} has been {status}!', 'success')
+    status = 'promoted to admin' if row.is_admin else 'removed from admin'
+    flash(f'{row.name} has been {status}!', 'success')
     return redirect(url_for('player_detail', id=id))
 
 
@@ -914,6 +1302,8 @@ def update_player_category(id):
 
     player.category = category
     db.session.commit()
+    clear_session_cache()  # Invalidate cached payment totals (player category shown there)
+    clear_player_cache()
 
     return jsonify({
         'success': True,
@@ -925,11 +1315,21 @@ def update_player_category(id):
 @app.route('/players/<int:id>/toggle-active', methods=['POST'])
 @admin_required
 def toggle_active(id):
-    player = Player.query.get_or_404(id)
-    player.is_active = not player.is_active
+    # Flip the flag and read back the new value and name in one UPDATE ... RETURNING
+    row = db.session.execute(
+        db.update(Player).where(Player.id == id).values(
+            is_active=db.not_(db.func.coalesce(Player.is_active, False))
+        ).returning(Player.is_active, Player.name)
+    ).first()
+    if row is None:
+        abort(404)
     db.session.commit()
-    status = 'activated' if player.is_active else 'deactivated'
-    flash(f'{player.name} has been {status}!', 'success')
+    clear_session_cache()  # Totals only count active players
+    clear_player_cache()
+    if not row.is_active:
+        revoke_player_sessions(id)  # Deactivated players are logged out immediately
+    status = 'activated' if row.is_active else 'deactivated'
+    flash(f'{row.name} has been {status}!', 'success')
     return redirect(url_for('player_detail', id=id))
 
 
@@ -939,6 +1339,7 @@ def approve_player(id):
     player = Player.query.get_or_404(id)
     player.is_approved = True
     db.session.commit()
+    clear_player_cache()
     admin_info = f"Admin" if session.get('user_type') == 'admin' else f"Player Admin (ID: {session.get('player_id')})"
     security_logger.info(f'PLAYER_APPROVED - Player: {player.name} (ID: {player.id}), By: {admin_info}, IP: {request.remote_addr}')
     flash(f'{player.name} has been approved!', 'success')
@@ -955,32 +1356,35 @@ def reject_player(id):
     security_logger.info(f'PLAYER_REJECTED - Player: {name}, Email: {email}, By: {admin_info}, IP: {request.remote_addr}')
     db.session.delete(player)
     db.session.commit()
+    clear_session_cache()  # Invalidate cached dashboard totals
+    clear_player_cache()
     flash(f'Registration for {name} has been rejected and removed.', 'success')
     return redirect(url_for('dashboard'))
 
 
 # Session routes
+ARCHIVED_SESSIONS_PAGE_SIZE = 100  # Archived sessions shown per page on the sessions list
+
+
 @app.route('/sessions')
 @admin_required
 def sessions():
     # Get active sessions
-    active_sessions = Session.query.filter_by(is_archived=False).order_by(Session.date.asc()).all()
-
-    # Batch load all attendance records for active sessions to avoid N+1
-    active_session_ids = [s.id for s in active_sessions]
-    all_attendances = Attendance.query.filter(Attendance.session_id.in_(active_session_ids)).all() if active_session_ids else []
+    active_sessions = Session.query.options(
+        selectinload(Session.attendances), selectinload(Session.courts), *debug_raiseload()
+    ).filter_by(is_archived=False).order_by(Session.date.asc()).all()
 
     # Build attendance map: {session_id: {player_id: status}}
     # Build attendance details: {session_id: {player_id: {status, payment_status, additional_cost, comments}}}
+    # (Session.attendances is selectin-loaded, so all active sessions' rows came in one IN query)
     attendance_map = {}
     attendance_details = {}
     for sess in active_sessions:
-        attendance_map[sess.id] = {}
-        attendance_details[sess.id] = {}
-    for att in all_attendances:
-        if att.session_id in attendance_map:
-            attendance_map[att.session_id][att.player_id] = att.status
-            attendance_details[att.session_id][att.player_id] = {
+        statuses = attendance_map[sess.id] = {}
+        details = attendance_details[sess.id] = {}
+        for att in sess.attendances:
+            statuses[att.player_id] = att.status
+            details[att.player_id] = {
                 'status': att.status,
                 'payment_status': att.payment_status or 'unpaid',
                 'additional_cost': att.additional_cost or 0,
@@ -990,24 +1394,41 @@ def sessions():
     # Get cached monthly summary (expensive calculation)
     monthly_sorted = get_cached_monthly_summary()
 
-    # Archived sessions grouped by year and month
-    all_sessions = Session.query.filter_by(is_archived=True).order_by(Session.date.desc()).all()
-    archived_sessions = all_sessions
+    # Archived sessions grouped by year and month, newest first and paged by (date, id):
+    # ?archived_before=<date>&archived_before_id=<id> continues after that session
+    archived_query = Session.query.options(
+        selectinload(Session.attendances), selectinload(Session.courts), *debug_raiseload()
+    ).filter_by(is_archived=True)
+    archived_before = request.args.get('archived_before')
+    if archived_before:
+        before_date = parse_input(archived_before, date.fromisoformat, 'archived_before')
+        before_id = request.args.get('archived_before_id', 0, type=int)
+        archived_query = archived_query.filter(db.or_(
+            Session.date < before_date,
+            db.and_(Session.date == before_date, Session.id < before_id)
+        ))
+    archived_sessions = archived_query.order_by(Session.date.desc(), Session.id.desc()).limit(
+        ARCHIVED_SESSIONS_PAGE_SIZE + 1
+    ).all()
+    next_archived = None
+    if len(archived_sessions) > ARCHIVED_SESSIONS_PAGE_SIZE:
+        archived_sessions = archived_sessions[:ARCHIVED_SESSIONS_PAGE_SIZE]
+        next_archived = archived_sessions[-1]
 
     # Group archived by year-month
     archived_grouped = {}
     for sess in archived_sessions:
         key = sess.date.strftime('%Y-%m')
-        label = sess.date.strftime('%B %Y')
-        if key not in archived_grouped:
-            archived_grouped[key] = {'label': label, 'sessions': []}
-        archived_grouped[key]['sessions'].append(sess)
+        group = archived_grouped.get(key)
+        if group is None:
+            group = archived_grouped[key] = {'label': month_label(key), 'sessions': []}
+        group['sessions'].append(sess)
 
     # Sort by key (year-month) descending
     archived_sorted = sorted(archived_grouped.items(), key=lambda x: x[0], reverse=True)
 
-    # Get all active players
-    all_players = Player.query.filter_by(is_active=True, is_approved=True).order_by(Player.name).all()
+    # Get all active players (from the cached roster)
+    all_players = [p for p in get_cached_player_roster() if p.is_active and p.is_approved]
 
     regular_players = [p for p in all_players if p.category == 'regular']
     adhoc_players = [p for p in all_players if p.category == 'adhoc']
@@ -1022,9 +1443,9 @@ def sessions():
     ).group_by(DropoutRefund.player_id).all()
     refund_map = {r.player_id: {'pending': r.pending_count or 0, 'refunded': r.total_refunded or 0} for r in refund_stats}
 
-    # 2. All sessions + courts in two queries (needed for all-time balance)
-    all_sessions_all = Session.query.all()
-    all_courts_all = Court.query.all()
+    # 2. All sessions + courts in two queries (needed for all-time balance; only the costing columns)
+    all_sessions_all = db.session.query(Session.id, Session.birdie_cost).all()
+    all_courts_all = db.session.query(Court.session_id, Court.court_type, Court.cost).all()
 
     # 3. All chargeable attendances (YES/DROPOUT/FILLIN) across all sessions
     all_chargeable_att = Attendance.query.filter(
@@ -1041,25 +1462,20 @@ def sessions():
     # Build court cost map: session_id -> {regular: X, adhoc: X}
     court_cost_by_session = {}
     for court in all_courts_all:
-        sid = court.session_id
-        if sid not in court_cost_by_session:
-            court_cost_by_session[sid] = {'regular': 0.0, 'adhoc': 0.0}
-        if court.court_type == 'adhoc':
-            court_cost_by_session[sid]['adhoc'] += court.cost
-        else:
-            court_cost_by_session[sid]['regular'] += court.cost
+        costs = court_cost_by_session.get(court.session_id)
+        if costs is None:
+            costs = court_cost_by_session[court.session_id] = {'regular': 0.0, 'adhoc': 0.0}
+        costs['adhoc' if court.court_type == 'adhoc' else 'regular'] += court.cost
 
     # Count YES+DROPOUT per session per category (FILLIN not counted in divisor)
     session_counts = {}
     for att in all_chargeable_att:
         if att.status in ('YES', 'DROPOUT'):
-            sid = att.session_id
-            if sid not in session_counts:
-                session_counts[sid] = {'regular': 0, 'adhoc': 0}
-            if att.category == 'adhoc':
-                session_counts[sid]['adhoc'] += 1
-            elif att.category == 'regular':
-                session_counts[sid]['regular'] += 1
+            counts = session_counts.get(att.session_id)
+            if counts is None:
+                counts = session_counts[att.session_id] = {'regular': 0, 'adhoc': 0}
+            if att.category in counts:
+                counts[att.category] += 1
 
     # Build per-session cost-per-player map
     session_birdie = {s.id: s.birdie_cost for s in all_sessions_all}
@@ -1103,54 +1519,58 @@ def sessions():
                           kid_players=kid_players,
                           attendance_map=attendance_map,
                           attendance_details=attendance_details,
-                          player_stats=player_stats)
+                          player_stats=player_stats,
+                          next_archived=next_archived,
+                          archived_paged=bool(archived_before))
 
 
 @app.route('/sessions/add', methods=['GET', 'POST'])
 @admin_required
 def add_session():
     if request.method == 'POST':
-        birdie_cost = float(request.form.get('birdie_cost', 2))
+        birdie_cost = parse_input(request.form.get('birdie_cost'), float, 'birdie cost', default=2.0)
         notes = request.form.get('notes', '')
 
         # Get all dates to create sessions for
-        date_count = int(request.form.get('date_count', 1))
-        created_sessions = []
-
-        players = Player.query.all()
+        date_count = parse_input(request.form.get('date_count'), int, 'date count', default=1)
+        session_rows = []
 
         for i in range(date_count):
             date_str = request.form.get(f'date_{i}')
             if not date_str:
                 continue
 
-            session_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-
-            new_session = Session(
-                date=session_date,
-                birdie_cost=birdie_cost,
-                notes=notes
-            )
-            db.session.add(new_session)
-            db.session.flush()
-
-            # No courts added during creation - they will be added when editing individual sessions
-
-            # Create attendance records for all players (default NO, category from player)
-            for player in players:
-                attendance = Attendance(player_id=player.id, session_id=new_session.id, status='NO', category=player.category)
-                db.session.add(attendance)
-
-            created_sessions.append(new_session)
-
+            session_rows.append({
+                'date': parse_input(date_str, date.fromisoformat, 'date'),
+                'birdie_cost': birdie_cost,
+                'notes': notes
+            })
+
+        # No courts added during creation - they will be added when editing individual sessions
+
+        # One batched INSERT ... RETURNING for all new sessions (only their ids are needed)
+        created_session_ids = []
+        if session_rows:
+            created_session_ids = db.session.scalars(db.insert(Session).returning(Session.id), session_rows).all()
+
+        # Attendance records for all players in every new session (default NO, category from player)
+        player_rows = db.session.query(Player.id, Player.category).all()
+        attendance_rows = [
+            {'player_id': pid, 'session_id': session_id, 'status': 'NO', 'category': category}
+            for session_id in created_session_ids
+            for pid, category in player_rows
+        ]
+
+        # Single INSERT ... ON CONFLICT DO NOTHING instead of one ORM object per player per session
+        Attendance.insert_missing(attendance_rows)
         db.session.commit()
         clear_session_cache()
 
-        if len(created_sessions) == 1:
+        if len(created_session_ids) == 1:
             flash('Session created! Edit the session to add courts.', 'success')
-            return redirect(url_for('session_detail', id=created_sessions[0].id))
+            return redirect(url_for('session_detail', id=created_session_ids[0]))
         else:
-            flash(f'{len(created_sessions)} sessions created! Edit each session to add courts.', 'success')
+            flash(f'{len(created_session_ids)} sessions created! Edit each session to add courts.', 'success')
             return redirect(url_for('sessions'))
 
     return render_template('session_form.html', session=None)
@@ -1160,41 +1580,32 @@ def add_session():
 @admin_required
 def session_detail(id):
     sess = Session.query.get_or_404(id)
-    players = Player.query.order_by(Player.name).all()
 
-    # Get attendance for all players
-    attendance_map = {}
-    category_map = {}
-    attendance_records = {}  # Full attendance records for additional fields
-    for att in sess.attendances.all():
-        attendance_map[att.player_id] = att.status
-        category_map[att.player_id] = att.category
-        attendance_records[att.player_id] = att
-
-    # Ensure all players have attendance records
-    for player in players:
-        if player.id not in attendance_map:
-            attendance = Attendance(player_id=player.id, session_id=id, status='NO', category=player.category)
-            db.session.add(attendance)
-            attendance_map[player.id] = 'NO'
-            category_map[player.id] = player.category
-            db.session.flush()
-            attendance_records[player.id] = attendance
-    db.session.commit()
+    # All players with their attendance for this session in one LEFT JOIN
+    # (players without a row are treated as 'NO' with their default category)
+    rows = db.session.query(Player, Attendance).outerjoin(
+        Attendance, and_(Attendance.player_id == Player.id, Attendance.session_id == id)
+    ).options(*debug_raiseload()).order_by(Player.name).all()
+    players = [player for player, _ in rows]
+
+    # Full attendance records for players who have a row, plus status/category lookups
+    attendance_records = {player.id: att for player, att in rows if att}
+    attendance_map = {pid: att.status for pid, att in attendance_records.items()}
+    category_map = {pid: att.category for pid, att in attendance_records.items()}
 
     # Calculate per-player session costs for bulk payment
+    # (each get_cost_per_* call rescans the session's attendances, so compute them once)
+    base_costs = {
+        'kid': sess.get_cost_per_kid(),
+        'adhoc': sess.get_cost_per_adhoc_player(),
+        'regular': sess.get_cost_per_regular_player(),
+    }
     player_session_costs = {}
     for player in players:
         if player.is_active:
             att = attendance_records.get(player.id)
             if att and att.status in ['YES', 'DROPOUT', 'FILLIN']:
-                cat = att.category
-                if cat == 'kid':
-                    base = sess.get_cost_per_kid()
-                elif cat == 'adhoc':
-                    base = sess.get_cost_per_adhoc_player()
-                else:
-                    base = sess.get_cost_per_regular_player()
+                base = base_costs.get(att.category, base_costs['regular'])
                 player_session_costs[player.id] = round(base + (att.additional_cost or 0), 2)
             else:
                 player_session_costs[player.id] = 0
@@ -1211,12 +1622,12 @@ def edit_session(id):
     sess = Session.query.get_or_404(id)
 
     if request.method == 'POST':
-        sess.date = datetime.strptime(request.form.get('date'), '%Y-%m-%d').date()
-        sess.birdie_cost = float(request.form.get('birdie_cost', 0))
+        sess.date = parse_input(request.form.get('date'), date.fromisoformat, 'date')
+        sess.birdie_cost = parse_input(request.form.get('birdie_cost'), float, 'birdie cost', default=0.0)
         sess.notes = request.form.get('notes')
 
         # Update time configuration
-        sess.hours = float(request.form.get('hours', 3))
+        sess.hours = parse_input(request.form.get('hours'), float, 'hours', default=3.0)
         sess.start_time = request.form.get('start_time', '06:30')
         sess.end_time = request.form.get('end_time', '09:30')
 
@@ -1240,26 +1651,24 @@ def edit_session(id):
         start_time_display = format_time(sess.start_time)
         end_time_display = format_time(sess.end_time)
 
-        court_count = int(request.form.get('court_count', 0))
+        court_count = parse_input(request.form.get('court_count'), int, 'court count', default=0)
 
         # Delete existing courts and recreate
         Court.query.filter_by(session_id=id).delete()
 
-        # Add courts
+        # Add courts (one batched INSERT for all of them)
+        court_rows = []
         for i in range(court_count):
-            court_name = request.form.get(f'court_name_{i}', f'Court {i+1}')
-            court_type = request.form.get(f'court_type_{i}', 'regular')
-            court_cost = float(request.form.get(f'court_cost_{i}', sess.court_cost))
-
-            court = Court(
-                session_id=id,
-                name=court_name,
-                court_type=court_type,
-                start_time=start_time_display,
-                end_time=end_time_display,
-                cost=court_cost
-            )
-            db.session.add(court)
+            court_rows.append({
+                'session_id': id,
+                'name': request.form.get(f'court_name_{i}', f'Court {i+1}'),
+                'court_type': request.form.get(f'court_type_{i}', 'regular'),
+                'start_time': start_time_display,
+                'end_time': end_time_display,
+                'cost': parse_input(request.form.get(f'court_cost_{i}'), float, 'court cost', default=sess.court_cost)
+            })
+        if court_rows:
+            db.session.execute(db.insert(Court), court_rows)
 
         db.session.commit()
         clear_session_cache()
@@ -1281,6 +1690,7 @@ def delete_session(id):
 
     db.session.delete(sess)
     db.session.commit()
+    clear_session_cache()  # Invalidate cached dashboard totals
     flash('Session deleted successfully!', 'success')
     return redirect(url_for('sessions'))
 
@@ -1316,12 +1726,11 @@ def bulk_archive_sessions():
         flash('No sessions selected', 'error')
         return redirect(url_for('sessions'))
 
-    count = 0
-    for session_id in session_ids:
-        sess = Session.query.get(int(session_id))
-        if sess and not sess.is_archived:
-            sess.is_archived = True
-            count += 1
+    # One UPDATE for all selected sessions; the row count is how many actually changed
+    ids = [parse_input(session_id, int, 'session') for session_id in session_ids]
+    count = Session.query.filter(Session.id.in_(ids), Session.is_archived.isnot(True)).update(
+        {'is_archived': True}, synchronize_session=False
+    )
 
     db.session.commit()
     clear_session_cache()  # Invalidate cached monthly summary
@@ -1337,12 +1746,11 @@ def bulk_unarchive_sessions():
         flash('No sessions selected', 'error')
         return redirect(url_for('sessions'))
 
-    count = 0
-    for session_id in session_ids:
-        sess = Session.query.get(int(session_id))
-        if sess and sess.is_archived:
-            sess.is_archived = False
-            count += 1
+    # One UPDATE for all selected sessions; the row count is how many actually changed
+    ids = [parse_input(session_id, int, 'session') for session_id in session_ids]
+    count = Session.query.filter(Session.id.in_(ids), Session.is_archived == True).update(
+        {'is_archived': False}, synchronize_session=False
+    )
 
     db.session.commit()
     clear_session_cache()  # Invalidate cached monthly summary
@@ -1360,7 +1768,7 @@ def bulk_delete_sessions():
 
     count = 0
     for session_id in session_ids:
-        sess = Session.query.get(int(session_id))
+        sess = Session.query.get(parse_input(session_id, int, 'session'))
         # Only delete archived sessions
         if sess and sess.is_archived:
             # Delete related dropout refunds first
@@ -1385,12 +1793,11 @@ def bulk_freeze_voting():
         flash('No sessions selected', 'error')
         return redirect(url_for('sessions'))
 
-    count = 0
-    for session_id in session_ids:
-        sess = Session.query.get(int(session_id))
-        if sess and not sess.voting_frozen:
-            sess.voting_frozen = True
-            count += 1
+    # One UPDATE for all selected sessions; the row count is how many actually changed
+    ids = [parse_input(session_id, int, 'session') for session_id in session_ids]
+    count = Session.query.filter(Session.id.in_(ids), Session.voting_frozen.isnot(True)).update(
+        {'voting_frozen': True}, synchronize_session=False
+    )
 
     db.session.commit()
     flash(f'Voting frozen for {count} session(s)!', 'success')
@@ -1405,12 +1812,11 @@ def bulk_unfreeze_voting():
         flash('No sessions selected', 'error')
         return redirect(url_for('sessions'))
 
-    count = 0
-    for session_id in session_ids:
-        sess = Session.query.get(int(session_id))
-        if sess and sess.voting_frozen:
-            sess.voting_frozen = False
-            count += 1
+    # One UPDATE for all selected sessions; the row count is how many actually changed
+    ids = [parse_input(session_id, int, 'session') for session_id in session_ids]
+    count = Session.query.filter(Session.id.in_(ids), Session.voting_frozen == True).update(
+        {'voting_frozen': False}, synchronize_session=False
+    )
 
     db.session.commit()
     flash(f'Voting unfrozen for {count} session(s)!', 'success')
@@ -1429,45 +1835,37 @@ def bulk_attendance():
     if not session_ids:
         return jsonify({'success': False, 'error': 'No sessions selected'})
 
-    # Get players based on category
+    # Get players based on category (only id and category are needed)
+    player_rows = db.session.query(Player.id, Player.category).filter_by(is_active=True)
     if category == 'regular':
-        players = Player.query.filter_by(is_active=True, category='regular').all()
+        players = player_rows.filter_by(category='regular').all()
     elif category == 'adhoc':
-        players = Player.query.filter_by(is_active=True, category='adhoc').all()
+        players = player_rows.filter_by(category='adhoc').all()
     elif category == 'kid':
-        players = Player.query.filter_by(is_active=True, category='kid').all()
+        players = player_rows.filter_by(category='kid').all()
     else:
-        players = Player.query.filter_by(is_active=True).all()
-
-    count = 0
-    for session_id in session_ids:
-        sess = Session.query.get(int(session_id))
-        if not sess:
-            continue
+        players = player_rows.all()
 
-        for player in players:
-            # Find existing attendance or create new
-            attendance = Attendance.query.filter_by(session_id=session_id, player_id=player.id).first()
+    # Selected sessions that exist (unknown ids are skipped)
+    requested_ids = [parse_input(session_id, int, 'session') for session_id in session_ids]
+    valid_session_ids = db.session.scalars(db.select(Session.id).where(Session.id.in_(requested_ids))).all()
+    player_ids = [player.id for player in players]
 
-            if status == 'CLEAR':
-                if attendance:
-                    db.session.delete(attendance)
-                    count += 1
-            else:
-                if attendance:
-                    attendance.status = status
-                    attendance.category = player.category
-                else:
-                    attendance = Attendance(
-                        session_id=session_id,
-                        player_id=player.id,
-                        status=status,
-                        category=player.category
-                    )
-                    db.session.add(attendance)
-                count += 1
+    if status == 'CLEAR':
+        # One DELETE for every existing (session, player) row
+        count = Attendance.query.filter(
+            Attendance.session_id.in_(valid_session_ids), Attendance.player_id.in_(player_ids)
+        ).delete(synchronize_session=False) if valid_session_ids and player_ids else 0
+    else:
+        # One upsert for every (session, player) pair: status and category are set on new and existing rows
+        Attendance.upsert_many([
+            {'session_id': session_id, 'player_id': player.id, 'status': status, 'category': player.category}
+            for session_id in valid_session_ids for player in players
+        ], ['status', 'category'])
+        count = len(valid_session_ids) * len(players)
 
     db.session.commit()
+    clear_session_cache()  # Invalidate cached dashboard totals
     return jsonify({'success': True, 'count': count})
 
 
@@ -1490,33 +1888,23 @@ def bulk_player_attendance():
     if not player:
         return jsonify({'success': False, 'error': 'Player not found'})
 
-    count = 0
-    for session_id in session_ids:
-        sess = Session.query.get(int(session_id))
-        if not sess:
-            continue
-
-        attendance = Attendance.query.filter_by(session_id=session_id, player_id=player_id).first()
+    # Selected sessions that exist (unknown ids are skipped)
+    requested_ids = [parse_input(session_id, int, 'session') for session_id in session_ids]
+    valid_session_ids = db.session.scalars(db.select(Session.id).where(Session.id.in_(requested_ids))).all()
 
-        if status == 'CLEAR':
-            if attendance:
-                db.session.delete(attendance)
-                count += 1
-        else:
-            if attendance:
-                attendance.status = status
-                attendance.category = player.category
-            else:
-                attendance = Attendance(
-                    session_id=session_id,
-                    player_id=player_id,
-                    status=status,
-                    category=player.category
-                )
-                db.session.add(attendance)
-            count += 1
+    if status == 'CLEAR':
+        count = Attendance.query.filter(
+            Attendance.player_id == player.id, Attendance.session_id.in_(valid_session_ids)
+        ).delete(synchronize_session=False) if valid_session_ids else 0
+    else:
+        Attendance.upsert_many([
+            {'session_id': session_id, 'player_id': player.id, 'status': status, 'category': player.category}
+            for session_id in valid_session_ids
+        ], ['status', 'category'])
+        count = len(valid_session_ids)
 
     db.session.commit()
+    clear_session_cache()  # Invalidate cached dashboard totals
     return jsonify({'success': True, 'count': count})
 
 
@@ -1524,11 +1912,16 @@ def bulk_player_attendance():
 @app.route('/sessions/<int:id>/refunds')
 @admin_required
 def session_refunds(id):
-    sess = Session.query.get_or_404(id)
+    # Attendances (with their players) and courts load with the session, so the dropout/fill-in
+    # lists and calculate_suggested_refund() need no further queries
+    sess = Session.query.options(
+        selectinload(Session.attendances).selectinload(Attendance.player),
+        selectinload(Session.courts), *debug_raiseload()
+    ).filter_by(id=id).first_or_404()
 
     # Get all dropouts for this session
-    dropouts = Attendance.query.filter_by(session_id=id, status='DROPOUT').all()
-    fillins = Attendance.query.filter_by(session_id=id, status='FILLIN').all()
+    dropouts = [att for att in sess.attendances if att.status == 'DROPOUT']
+    fillins = [att for att in sess.attendances if att.status == 'FILLIN']
 
     # Get existing refunds
     refunds = DropoutRefund.query.filter_by(session_id=id).all()
@@ -1550,8 +1943,8 @@ def session_refunds(id):
 @admin_required
 def add_dropout_refund(id):
     sess = Session.query.get_or_404(id)
-    player_id = int(request.form.get('player_id'))
-    refund_amount = float(request.form.get('refund_amount', 0))
+    player_id = parse_input(request.form.get('player_id'), int, 'player')
+    refund_amount = parse_input(request.form.get('refund_amount'), float, 'refund amount', default=0.0)
     instructions = request.form.get('instructions', '').strip()
 
     # Check if refund already exists
@@ -1572,6 +1965,7 @@ def add_dropout_refund(id):
     )
     db.session.add(refund)
     db.session.commit()
+    clear_session_cache()  # Invalidate cached refund totals
 
     player = Player.query.get(player_id)
     flash(f'Refund of ${refund_amount:.2f} created for {player.name}', 'success')
@@ -1585,26 +1979,36 @@ def update_dropout_refund(id):
     session_id = refund.session_id
 
     action = request.form.get('action')
+    session_date = refund.session.date.strftime("%b %d, %Y")
+
+    def find_refund_payment():
+        # Only trust the link if it still points at this player's refund credit; refunds processed
+        # before payment_id existed (or whose link no longer fits) fall back to matching the notes
+        if refund.payment_id:
+            payment = refund.payment
+            if payment and payment.method == 'Refund' and payment.player_id == refund.player_id:
+                return payment
+        return Payment.query.filter_by(
+            player_id=refund.player_id,
+            method='Refund'
+        ).filter(
+            Payment.notes.like(f'%Dropout refund for session {session_date}%')
+        ).first()
 
     if action == 'update':
         old_amount = refund.refund_amount
-        new_amount = float(request.form.get('refund_amount', refund.refund_amount))
+        new_amount = parse_input(request.form.get('refund_amount'), float, 'refund amount', default=refund.refund_amount)
         refund.refund_amount = new_amount
         refund.instructions = request.form.get('instructions', '').strip()
 
         # If already processed, update the corresponding payment record
         if refund.status == 'processed':
-            # Find and update the payment record
-            payment = Payment.query.filter_by(
-                player_id=refund.player_id,
-                method='Refund'
-            ).filter(
-                Payment.notes.like(f'%Dropout refund for session {refund.session.date.strftime("%b %d, %Y")}%')
-            ).first()
+            payment = find_refund_payment()
 
             if payment:
                 payment.amount = -new_amount
-                payment.notes = f'Dropout refund for session {refund.session.date.strftime("%b %d, %Y")}. {refund.instructions or ""}'.strip()
+                payment.notes = f'Dropout refund for session {session_date}. {refund.instructions or ""}'.strip()
+                refund.payment = payment
                 flash(f'Refund updated from ${old_amount:.2f} to ${new_amount:.2f} and payment record adjusted', 'success')
             else:
                 flash('Refund updated but could not find corresponding payment record', 'error')
@@ -1621,22 +2025,19 @@ def update_dropout_refund(id):
             amount=-refund.refund_amount,  # Negative amount = credit/refund
             method='Refund',
             date=datetime.utcnow(),
-            notes=f'Dropout refund for session {refund.session.date.strftime("%b %d, %Y")}. {refund.instructions or ""}'.strip()
+            notes=f'Dropout refund for session {session_date}. {refund.instructions or ""}'.strip()
         )
         db.session.add(payment)
+        refund.payment = payment
         flash(f'Refund of ${refund.refund_amount:.2f} processed and credited to {refund.player.name}', 'success')
 
     elif action == 'cancel':
         # If already processed, remove the payment record
         if refund.status == 'processed':
-            payment = Payment.query.filter_by(
-                player_id=refund.player_id,
-                method='Refund'
-            ).filter(
-                Payment.notes.like(f'%Dropout refund for session {refund.session.date.strftime("%b %d, %Y")}%')
-            ).first()
+            payment = find_refund_payment()
 
             if payment:
+                refund.payment = None
                 db.session.delete(payment)
                 flash('Refund cancelled and payment record removed', 'success')
             else:
@@ -1647,6 +2048,7 @@ def update_dropout_refund(id):
         refund.status = 'cancelled'
 
     db.session.commit()
+    clear_session_cache()  # Invalidate cached payment and refund totals
     return redirect(url_for('session_refunds', id=session_id))
 
 
@@ -1657,6 +2059,7 @@ def delete_dropout_refund(id):
     session_id = refund.session_id
     db.session.delete(refund)
     db.session.commit()
+    clear_session_cache()  # Invalidate cached refund totals
     flash('Refund deleted successfully!', 'success')
     return redirect(url_for('session_refunds', id=session_id))
 
@@ -1677,7 +2080,7 @@ def batch_update_attendance():
     errors = []
 
     for update in updates:
-        player_id = update.get('player_id')
+        player_id = parse_input(update.get('player_id'), int, 'player id')
         session_id = update.get('session_id')
         status = update.get('status')
 
@@ -1685,12 +2088,13 @@ def batch_update_attendance():
             errors.append(f'Invalid status for session {session_id}, player {player_id}')
             continue
 
+        # Repeat sessions come from the identity map, with their attendances already loaded
         sess = Session.query.get(session_id)
         if not sess:
             errors.append(f'Session {session_id} not found')
             continue
 
-        attendance = Attendance.query.filter_by(player_id=player_id, session_id=session_id).first()
+        attendance = sess.get_attendance(player_id)
         current_status = attendance.status if attendance else None
 
         # When session is frozen, only allow specific transitions
@@ -1710,7 +2114,7 @@ def batch_update_attendance():
 
         if status == 'CLEAR':
             if attendance:
-                db.session.delete(attendance)
+                sess.attendances.remove(attendance)  # delete-orphan deletes the row
         elif attendance:
             old_status = attendance.status
             attendance.status = status
@@ -1741,12 +2145,11 @@ def batch_update_attendance():
         else:
             player = Player.query.get(player_id)
             attendance = Attendance(
-                session_id=session_id,
                 player_id=player_id,
                 status=status,
                 category=player.category if player else 'regular'
             )
-            db.session.add(attendance)
+            sess.attendances.append(attendance)
 
         results.append({'session_id': session_id, 'player_id': player_id, 'status': status})
 
@@ -1773,15 +2176,16 @@ def update_attendance():
     if status not in ['YES', 'NO', 'TENTATIVE', 'DROPOUT', 'FILLIN', 'CLEAR']:
         return jsonify({'error': 'Invalid status'}), 400
 
-    sess = Session.query.get(session_id)
+    # Attendances are only needed for a frozen session's refund suggestion, so don't eager-load them here
+    sess = Session.query.options(lazyload(Session.attendances)).get(session_id)
     if not sess:
         return jsonify({'error': 'Session not found'}), 404
 
-    attendance = Attendance.query.filter_by(player_id=player_id, session_id=session_id).first()
-    current_status = attendance.status if attendance else None
-
-    # When session is frozen, only allow specific transitions
+    # When session is frozen, only allow specific transitions (the current status is only needed here)
+    old_status = None
     if sess.voting_frozen:
+        attendance = Attendance.query.filter_by(player_id=player_id, session_id=session_id).first()
+        old_status = attendance.status if attendance else None
         allowed_transitions = {
             'YES': ['DROPOUT'],  # YES can only change to DROPOUT
             'NO': ['FILLIN'],    # NO can only change to FILLIN
@@ -1791,16 +2195,19 @@ def update_attendance():
             None: ['FILLIN'],    # No status can change to FILLIN
         }
 
-        allowed = allowed_transitions.get(current_status, [])
-        if status not in allowed and status != current_status:
+        allowed = allowed_transitions.get(old_status, [])
+        if status not in allowed and status != old_status:
             return jsonify({'error': f'Session is frozen. Only Dropout and Fill-in changes are allowed.'}), 403
 
     if status == 'CLEAR':
-        if attendance:
-            db.session.delete(attendance)
-    elif attendance:
-        old_status = attendance.status
-        attendance.status = status
+        Attendance.query.filter_by(player_id=player_id, session_id=session_id).delete()
+    else:
+        Attendance.upsert(player_id, session_id, {'status': status},
+                          insert_defaults={'category': Attendance.default_category(player_id)})
+
+        if sess.voting_frozen:
+            # Upsert bypasses the ORM; reload so refund suggestions see the new status
+            db.session.expire_all()
 
         # Auto-create refund when dropping out of a frozen session
         if sess.voting_frozen and status == 'DROPOUT' and old_status == 'YES':
@@ -1826,19 +2233,16 @@ def update_attendance():
             ).first()
             if existing_refund:
                 db.session.delete(existing_refund)
-    else:
-        player = Player.query.get(player_id)
-        attendance = Attendance(player_id=player_id, session_id=session_id, status=status, category=player.category if player else 'regular')
-        db.session.add(attendance)
 
     db.session.commit()
     clear_session_cache()  # Invalidate cached data
 
     # Return updated session costs
+    attendee_count, cost_per_player = Session.attendee_stats(session_id)
     return jsonify({
         'success': True,
-        'attendee_count': sess.get_attendee_count(),
-        'cost_per_player': sess.get_cost_per_player()
+        'attendee_count': attendee_count,
+        'cost_per_player': cost_per_player
     })
 
 
@@ -1855,15 +2259,10 @@ def update_attendance_category():
     if category not in ['regular', 'adhoc', 'kid']:
         return jsonify({'error': 'Invalid category'}), 400
 
-    attendance = Attendance.query.filter_by(player_id=player_id, session_id=session_id).first()
-
-    if attendance:
-        attendance.category = category
-    else:
-        attendance = Attendance(player_id=player_id, session_id=session_id, status='NO', category=category)
-        db.session.add(attendance)
-
+    # Players without an attendance row yet get one marked 'NO'
+    Attendance.upsert(player_id, session_id, {'category': category}, insert_defaults={'status': 'NO'})
     db.session.commit()
+    clear_session_cache()  # Invalidate cached dashboard totals
 
     return jsonify({
         'success': True,
@@ -1880,16 +2279,14 @@ def update_attendance_additional_cost():
     data = request.get_json()
     player_id = data.get('player_id')
     session_id = data.get('session_id')
-    additional_cost = float(data.get('additional_cost', 0))
-
-    attendance = Attendance.query.filter_by(player_id=player_id, session_id=session_id).first()
-
-    if attendance:
-        attendance.additional_cost = additional_cost
-        db.session.commit()
-        return jsonify({'success': True})
+    additional_cost = parse_input(data.get('additional_cost'), float, 'additional cost', default=0.0)
 
-    return jsonify({'error': 'Attendance record not found'}), 404
+    # Players without an attendance row yet get one marked 'NO'
+    Attendance.upsert(player_id, session_id, {'additional_cost': additional_cost},
+                      insert_defaults={'status': 'NO', 'category': Attendance.default_category(player_id)})
+    db.session.commit()
+    clear_session_cache()  # Invalidate cached dashboard totals
+    return jsonify({'success': True})
 
 
 @app.route('/api/attendance/payment-status', methods=['POST'])
@@ -1904,14 +2301,12 @@ def update_attendance_payment_status():
     if payment_status not in ['unpaid', 'paid']:
         return jsonify({'error': 'Invalid payment status'}), 400
 
-    attendance = Attendance.query.filter_by(player_id=player_id, session_id=session_id).first()
-
-    if attendance:
-        attendance.payment_status = payment_status
-        db.session.commit()
-        return jsonify({'success': True})
-
-    return jsonify({'error': 'Attendance record not found'}), 404
+    # Players without an attendance row yet get one marked 'NO'
+    Attendance.upsert(player_id, session_id, {'payment_status': payment_status},
+                      insert_defaults={'status': 'NO', 'category': Attendance.default_category(player_id)})
+    db.session.commit()
+    clear_session_cache()  # Invalidate cached data
+    return jsonify({'success': True})
 
 
 @app.route('/api/attendance/comments', methods=['POST'])
@@ -1923,14 +2318,12 @@ def update_attendance_comments():
     session_id = data.get('session_id')
     comments = data.get('comments', '')
 
-    attendance = Attendance.query.filter_by(player_id=player_id, session_id=session_id).first()
-
-    if attendance:
-        attendance.comments = comments
-        db.session.commit()
-        return jsonify({'success': True})
-
-    return jsonify({'error': 'Attendance record not found'}), 404
+    # Players without an attendance row yet get one marked 'NO'
+    Attendance.upsert(player_id, session_id, {'comments': comments},
+                      insert_defaults={'status': 'NO', 'category': Attendance.default_category(player_id)})
+    db.session.commit()
+    clear_session_cache()  # Invalidate cached data
+    return jsonify({'success': True})
 
 
 @app.route('/api/bulk-attendance-players', methods=['POST'])
@@ -1948,30 +2341,23 @@ def bulk_attendance_players():
     if not player_ids:
         return jsonify({'error': 'No players selected'}), 400
 
-    if not session_ids:
-        session_ids = [s.id for s in Session.query.filter_by(is_archived=False).all()]
+    # Existing sessions (all active ones if none given) and players, one query each
+    session_query = db.select(Session.id)
+    if session_ids:
+        session_query = session_query.where(Session.id.in_([parse_input(sid, int, 'session') for sid in session_ids]))
+    else:
+        session_query = session_query.where(Session.is_archived == False)
+    valid_session_ids = db.session.scalars(session_query).all()
+    players = db.session.query(Player.id, Player.category).filter(
+        Player.id.in_([parse_input(pid, int, 'player') for pid in player_ids])
+    ).all()
 
-    count = 0
-    for session_id in session_ids:
-        sess = Session.query.get(session_id)
-        if not sess:
-            continue
-        for player_id in player_ids:
-            player = Player.query.get(player_id)
-            if not player:
-                continue
-            att = Attendance.query.filter_by(session_id=session_id, player_id=player_id).first()
-            if att:
-                att.status = status
-            else:
-                att = Attendance(
-                    session_id=session_id,
-                    player_id=player_id,
-                    status=status,
-                    category=player.category
-                )
-                db.session.add(att)
-            count += 1
+    # Existing rows only get the new status; new rows take the player's category
+    Attendance.upsert_many([
+        {'session_id': session_id, 'player_id': player.id, 'status': status, 'category': player.category}
+        for session_id in valid_session_ids for player in players
+    ], ['status'])
+    count = len(valid_session_ids) * len(players)
 
     db.session.commit()
     cache.clear()
@@ -1998,8 +2384,8 @@ def bulk_session_payment():
     session_date_str = sess.date.strftime("%b %d, %Y")
     count = 0
     for p_data in payments_data:
-        player_id = p_data.get('player_id')
-        amount = float(p_data.get('amount', 0))
+        player_id = parse_input(p_data.get('player_id'), int, 'player id', default=None)
+        amount = parse_input(p_data.get('amount'), float, 'amount', default=0.0)
 
         if not player_id or amount <= 0:
             continue
@@ -2017,13 +2403,14 @@ def bulk_session_payment():
         )
         db.session.add(payment)
 
-        att = Attendance.query.filter_by(player_id=player_id, session_id=session_id).first()
+        att = sess.get_attendance(player_id)
         if att:
             att.payment_status = 'paid'
 
         count += 1
 
     db.session.commit()
+    clear_session_cache()  # Invalidate cached dashboard totals
     return jsonify({'success': True, 'count': count})
 
 
@@ -2033,12 +2420,13 @@ def bulk_session_payment():
 def update_player_additional_charges():
     data = request.get_json()
     player_id = data.get('player_id')
-    additional_charges = float(data.get('additional_charges', 0))
+    additional_charges = parse_input(data.get('additional_charges'), float, 'additional charges', default=0.0)
 
     player = Player.query.get(player_id)
     if player:
         player.additional_charges = additional_charges
         db.session.commit()
+        clear_player_cache()
         return jsonify({'success': True})
 
     return jsonify({'error': 'Player not found'}), 404
@@ -2056,29 +2444,44 @@ def update_player_comments():
     if player:
         player.admin_comments = comments
         db.session.commit()
+        clear_player_cache()
         return jsonify({'success': True})
 
     return jsonify({'error': 'Player not found'}), 404
 
 
 # Payment routes
+PAYMENTS_PAGE_SIZE = 100  # Payment history rows shown per page
+
+
 @app.route('/payments')
 @admin_required
 def payments():
-    payment_list = Payment.query.order_by(Payment.date.desc()).all()
-
-    # Calculate totals
-    total_collected = sum(p.amount for p in payment_list)
-
-    # Outstanding balances
-    players = Player.query.all()
-    balances = [(p, p.get_balance()) for p in players if p.get_balance() > 0]
-    balances.sort(key=lambda x: x[1], reverse=True)
+    # Payment history is display-only, so page it by (date, id): ?before=<datetime>&before_id=<id>
+    payment_query = Payment.query.options(selectinload(Payment.player), *debug_raiseload())
+    before = request.args.get('before')
+    if before:
+        before_date = parse_input(before, datetime.fromisoformat, 'before')
+        before_id = request.args.get('before_id', 0, type=int)
+        payment_query = payment_query.filter(db.or_(
+            Payment.date < before_date,
+            db.and_(Payment.date == before_date, Payment.id < before_id)
+        ))
+    payment_list = payment_query.order_by(Payment.date.desc(), Payment.id.desc()).limit(PAYMENTS_PAGE_SIZE + 1).all()
+    next_payment = None
+    if len(payment_list) > PAYMENTS_PAGE_SIZE:
+        payment_list = payment_list[:PAYMENTS_PAGE_SIZE]
+        next_payment = payment_list[-1]
+
+    # Total collected and outstanding balances (aggregated in SQL, cached briefly)
+    total_collected, balances = get_cached_payment_totals()
 
     return render_template('payments.html',
                          payments=payment_list,
-                         total_collected=round(total_collected, 2),
-                         outstanding_balances=balances)
+                         total_collected=total_collected,
+                         outstanding_balances=balances,
+                         next_payment=next_payment,
+                         payments_paged=bool(before))
 
 
 @app.route('/api/bulk-payment', methods=['POST'])
@@ -2094,12 +2497,12 @@ def bulk_payment_api():
     if not payments_data:
         return jsonify({'error': 'No payments provided'}), 400
 
-    payment_date = datetime.strptime(date_str, '%Y-%m-%d') if date_str else datetime.utcnow()
+    payment_date = parse_input(date_str, datetime.fromisoformat, 'date', default=None) or datetime.utcnow()
 
     count = 0
     for p_data in payments_data:
         player_id = p_data.get('player_id')
-        amount = float(p_data.get('amount', 0))
+        amount = parse_input(p_data.get('amount'), float, 'amount', default=0.0)
 
         if not player_id or amount <= 0:
             continue
@@ -2119,6 +2522,7 @@ def bulk_payment_api():
         count += 1
 
     db.session.commit()
+    clear_session_cache()  # Invalidate cached dashboard totals
     return jsonify({'success': True, 'count': count})
 
 
@@ -2126,13 +2530,13 @@ def bulk_payment_api():
 @admin_required
 def add_payment():
     if request.method == 'POST':
-        player_id = int(request.form.get('player_id'))
-        amount = float(request.form.get('amount'))
+        player_id = parse_input(request.form.get('player_id'), int, 'player')
+        amount = parse_input(request.form.get('amount'), float, 'amount')
         method = request.form.get('method')
         date_str = request.form.get('date')
         notes = request.form.get('notes')
 
-        payment_date = datetime.strptime(date_str, '%Y-%m-%d') if date_str else datetime.utcnow()
+        payment_date = parse_input(date_str, datetime.fromisoformat, 'date', default=None) or datetime.utcnow()
 
         payment = Payment(
             player_id=player_id,
@@ -2143,21 +2547,27 @@ def add_payment():
         )
         db.session.add(payment)
         db.session.commit()
+        clear_session_cache()  # Invalidate cached dashboard totals
 
         player = Player.query.get(player_id)
         flash(f'Payment of ${amount:.2f} from {player.name} recorded!', 'success')
         return redirect(url_for('payments'))
 
-    players = Player.query.order_by(Player.name).all()
+    players = Player.query.options(load_only(Player.id, Player.name), *balance_loaders()).order_by(Player.name).all()
     return render_template('payment_form.html', players=players, payment=None, today=date.today().isoformat())
 
 
 @app.route('/payments/<int:id>/delete', methods=['POST'])
 @admin_required
 def delete_payment(id):
-    payment = Payment.query.get_or_404(id)
-    db.session.delete(payment)
+    # Unlink any refund credited by this payment in the same transaction: the Core DELETE skips
+    # the ORM, and SQLite doesn't enforce ON DELETE SET NULL (it can reuse the id for a new payment)
+    db.session.execute(db.update(DropoutRefund).where(DropoutRefund.payment_id == id).values(payment_id=None))
+    deleted = db.session.execute(db.delete(Payment).where(Payment.id == id).returning(Payment.id)).first()
+    if deleted is None:
+        abort(404)
     db.session.commit()
+    clear_session_cache()  # Invalidate cached dashboard totals
     flash('Payment deleted successfully!', 'success')
     return redirect(url_for('payments'))
 
@@ -2166,12 +2576,14 @@ def delete_payment(id):
 @app.route('/birdie-bank')
 @admin_required
 def birdie_bank():
-    transactions = BirdieBank.query.order_by(BirdieBank.date.desc()).all()
+    transactions = BirdieBank.query.options(selectinload(BirdieBank.session), *debug_raiseload()).order_by(
+        BirdieBank.date.desc()
+    ).all()
     current_stock = BirdieBank.get_current_stock()
     total_spent = BirdieBank.get_total_spent()
 
-    # Get sessions for linking usage
-    sessions_list = Session.query.order_by(Session.date.desc()).limit(20).all()
+    # Get sessions for linking usage (just id and date for the dropdown)
+    sessions_list = db.session.query(Session.id, Session.date).order_by(Session.date.desc()).limit(20).all()
 
     return render_template('birdie_bank.html',
                          transactions=transactions,
@@ -2185,13 +2597,13 @@ def birdie_bank():
 @admin_required
 def add_birdie_transaction():
     transaction_type = request.form.get('transaction_type')
-    quantity = int(request.form.get('quantity'))
-    cost = float(request.form.get('cost', 0))
+    quantity = parse_input(request.form.get('quantity'), int, 'quantity')
+    cost = parse_input(request.form.get('cost'), float, 'cost', default=0.0)
     notes = request.form.get('notes')
     date_str = request.form.get('date')
     session_id = request.form.get('session_id')
 
-    transaction_date = datetime.strptime(date_str, '%Y-%m-%d') if date_str else datetime.utcnow()
+    transaction_date = parse_input(date_str, datetime.fromisoformat, 'date', default=None) or datetime.utcnow()
 
     transaction = BirdieBank(
         transaction_type=transaction_type,
@@ -2199,10 +2611,11 @@ def add_birdie_transaction():
         cost=cost if transaction_type == 'purchase' else 0,
         notes=notes,
         date=transaction_date,
-        session_id=int(session_id) if session_id else None
+        session_id=parse_input(session_id, int, 'session', default=None)
     )
     db.session.add(transaction)
     db.session.commit()
+    clear_session_cache()  # Invalidate cached data
 
     if transaction_type == 'purchase':
         flash(f'Added {quantity} birdies to inventory (${cost:.2f})', 'success')
@@ -2218,6 +2631,7 @@ def delete_birdie_transaction(id):
     transaction = BirdieBank.query.get_or_404(id)
     db.session.delete(transaction)
     db.session.commit()
+    clear_session_cache()  # Invalidate cached data
     flash('Transaction deleted successfully!', 'success')
     return redirect(url_for('birdie_bank'))
 
@@ -2232,7 +2646,7 @@ def reset_admin_password():
         confirm_password = request.form.get('confirm_password')
 
         # Verify current admin password
-        if current_password != app.config['APP_PASSWORD']:
+        if not check_admin_password(current_password):
             flash('Current admin password is incorrect', 'error')
             return redirect(url_for('reset_admin_password'))
 
@@ -2260,5 +2674,15 @@ def ratelimit_handler(e):
     return redirect(url_for('login'))
 
 
+# Compile every template once at import: under gunicorn --preload that happens in the master,
+# so forked workers share the compiled templates instead of each parsing them on first use
+# (Jinja keeps them without re-checking the files because auto_reload is off outside debug)
+if app.config['IS_PRODUCTION']:
+    for template_name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(template_name)
+
+
 if __name__ == '__main__':
+    with app.app_context():
+        db.create_all()
     app.run(debug=True, port=5050)  # Using 5050 as 5000 is often used by macOS AirPlay
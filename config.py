@@ -14,11 +14,37 @@ def get_database_url():
     # Default to SQLite for local development
     return 'sqlite:///bpbadi.db'
 
+def get_engine_options(database_url):
+    """Connection pool settings - PostgreSQL keeps warm connections so requests skip the TCP/TLS handshake"""
+    # Larger compiled-statement cache: the app has a few hundred distinct queries
+    options = {'query_cache_size': 1500}
+    if database_url.startswith('postgresql'):
+        # One pooled connection per gunicorn thread, with headroom for bursts;
+        # pre-ping and recycle replace connections Render closed while idle
+        threads = int(os.environ.get('GUNICORN_THREADS', 4))
+        options.update(
+            pool_size=threads,
+            max_overflow=threads,
+            pool_pre_ping=True,
+            pool_recycle=300,
+        )
+    return options
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = get_database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = get_engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     APP_PASSWORD = os.environ.get('APP_PASSWORD') or 'bpbadi2024'
 
+    # Player password hashing - iterations pinned so a werkzeug upgrade doesn't change login CPU cost
+    # (existing hashes keep verifying with the iterations stored in them)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:600000'
+
+    # Optional Redis (e.g. redis://host:6379/0 or unix:///path/to/redis.sock) - when set,
+    # login sessions are stored server-side in Redis instead of in the signed cookie, and cached
+    # dashboard/payments totals and rate-limit counters are shared by all workers
+    REDIS_URL = os.environ.get('REDIS_URL')
+
     # Environment detection
     IS_PRODUCTION = os.environ.get('RENDER') == 'true'
@@ -97,6 +97,13 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        # pysqlite never opens a transaction for DDL, so on SQLite every statement would commit
+        # (and sync to disk) on its own; run the whole upgrade in one explicit transaction instead.
+        # Alembic sees the transaction already open and leaves committing it to us.
+        sqlite_transaction = connection.dialect.name == 'sqlite'
+        if sqlite_transaction:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
@@ -106,6 +113,9 @@ def run_migrations_online():
         with context.begin_transaction():
             context.run_migrations()
 
+        if sqlite_transaction:
+            connection.commit()
+
 
 if context.is_offline_mode():
     run_migrations_offline()
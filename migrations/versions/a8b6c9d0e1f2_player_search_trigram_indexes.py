@@ -0,0 +1,48 @@
+"""add trigram indexes for player search on PostgreSQL
+
+Revision ID: a8b6c9d0e1f2
+Revises: f7a5b8c9d0e1
+Create Date: 2026-10-15 18:00:00.000000
+
+The players page searches name, phone and email with ILIKE '%term%'. A leading
+wildcard can't use the btree indexes, so every search scanned the table. On
+PostgreSQL, pg_trgm GIN indexes serve ILIKE substring matches directly, with no
+change to the query. SQLite (local development only) has no equivalent for
+substring ILIKE and is left as is; FTS5 would change the search semantics to
+whole-token matching. Uses IF NOT EXISTS so it is safe to re-run.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8b6c9d0e1f2'
+down_revision = 'f7a5b8c9d0e1'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_COLUMNS = ('name', 'phone', 'email')
+
+
+def _is_postgresql():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade():
+    if not _is_postgresql():
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in SEARCH_COLUMNS:
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_player_{column}_trgm "
+            f"ON players USING gin ({column} gin_trgm_ops)"
+        )
+
+
+def downgrade():
+    if not _is_postgresql():
+        return
+    # The pg_trgm extension is left installed; other objects may depend on it
+    for column in SEARCH_COLUMNS:
+        op.execute(f"DROP INDEX IF EXISTS idx_player_{column}_trgm")
@@ -0,0 +1,37 @@
+"""link dropout refunds to their credit payment
+
+Revision ID: b9c7d0e1f2a3
+Revises: a8b6c9d0e1f2
+Create Date: 2026-10-15 19:00:00.000000
+
+Processed refunds located their credit payment by a LIKE match on the payment
+notes, which scans the player's payments and breaks if the notes are edited.
+Stores the payment id on the refund so it can be fetched by primary key.
+Refunds processed before this migration keep payment_id NULL and fall back to
+the notes match. Checks the existing columns so it is safe to re-run.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine.reflection import Inspector
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9c7d0e1f2a3'
+down_revision = 'a8b6c9d0e1f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = Inspector.from_engine(op.get_bind())
+    dr_cols = {c['name'] for c in inspector.get_columns('dropout_refunds')}
+    if 'payment_id' not in dr_cols:
+        op.execute(
+            "ALTER TABLE dropout_refunds ADD COLUMN payment_id INTEGER "
+            "REFERENCES payments(id) ON DELETE SET NULL"
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('dropout_refunds') as batch_op:
+        batch_op.drop_column('payment_id')
@@ -0,0 +1,34 @@
+"""add (session_id, player_id) index on dropout_refunds
+
+Revision ID: c0d8e1f2a3b4
+Revises: b9c7d0e1f2a3
+Create Date: 2026-10-15 20:00:00.000000
+
+Attendance changes look up a player's refund for a session with
+filter_by(session_id=..., player_id=...). Databases whose dropout_refunds table
+was created by b3c1d2e4f5a6 have no index on session_id at all, so those
+lookups scanned the table. attendances already has unique_player_session and
+idx_attendance_session_status_cat for the equivalent lookups. Uses CREATE INDEX
+IF NOT EXISTS so it is safe on databases where db.create_all() already
+created it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c0d8e1f2a3b4'
+down_revision = 'b9c7d0e1f2a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_refund_session_player "
+        "ON dropout_refunds (session_id, player_id)"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_refund_session_player")
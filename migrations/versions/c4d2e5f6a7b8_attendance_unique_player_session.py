@@ -0,0 +1,45 @@
+"""ensure unique (player_id, session_id) index on attendances
+
+Revision ID: c4d2e5f6a7b8
+Revises: b3c1d2e4f5a6
+Create Date: 2026-10-15 10:00:00.000000
+
+Attendance writes use INSERT ... ON CONFLICT (player_id, session_id), which
+needs a unique index on those columns. Databases created before the
+unique_player_session constraint existed may be missing it, so duplicates are
+collapsed (keeping the newest row) before the index is created.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine.reflection import Inspector
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d2e5f6a7b8'
+down_revision = 'b3c1d2e4f5a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = Inspector.from_engine(conn)
+
+    unique_sets = [tuple(uc['column_names']) for uc in inspector.get_unique_constraints('attendances')]
+    unique_sets += [tuple(idx['column_names']) for idx in inspector.get_indexes('attendances') if idx.get('unique')]
+    if any(set(cols) == {'player_id', 'session_id'} for cols in unique_sets):
+        return
+
+    op.execute(
+        "DELETE FROM attendances WHERE id NOT IN ("
+        "SELECT MAX(id) FROM attendances GROUP BY player_id, session_id)"
+    )
+    op.execute(
+        "CREATE UNIQUE INDEX unique_player_session "
+        "ON attendances (player_id, session_id)"
+    )
+
+
+def downgrade():
+    # Intentionally left empty — the unique index is required by the attendance upsert
+    pass
@@ -0,0 +1,31 @@
+"""add lower(email) index on players
+
+Revision ID: d5e3f6a7b8c9
+Revises: c4d2e5f6a7b8
+Create Date: 2026-10-15 11:00:00.000000
+
+Login, registration and profile updates look players up by
+lower(email); an expression index lets those use an index probe instead
+of scanning the table. Uses CREATE INDEX IF NOT EXISTS so it is safe on
+databases where db.create_all() already created it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e3f6a7b8c9'
+down_revision = 'c4d2e5f6a7b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_player_email_lower "
+        "ON players (lower(email))"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_player_email_lower")
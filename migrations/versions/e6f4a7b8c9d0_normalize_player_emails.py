@@ -0,0 +1,34 @@
+"""store player emails lowercased
+
+Revision ID: e6f4a7b8c9d0
+Revises: d5e3f6a7b8c9
+Create Date: 2026-10-15 12:00:00.000000
+
+Player emails are now trimmed and lowercased on every write, so login and
+registration compare with plain equality against the existing email index.
+Existing rows are normalized here, and the lower(email) expression index is
+dropped since nothing queries lower(email) any more.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6f4a7b8c9d0'
+down_revision = 'd5e3f6a7b8c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE players SET email = lower(trim(email)) WHERE email IS NOT NULL")
+    op.execute("UPDATE players SET email = NULL WHERE email = ''")
+    op.execute("DROP INDEX IF EXISTS idx_player_email_lower")
+
+
+def downgrade():
+    # Lowercasing is not reversible; only restore the expression index
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_player_email_lower "
+        "ON players (lower(email))"
+    )
@@ -0,0 +1,39 @@
+"""add composite indexes for per-player payments and session lists
+
+Revision ID: f7a5b8c9d0e1
+Revises: e6f4a7b8c9d0
+Create Date: 2026-10-15 13:00:00.000000
+
+Player payment history is read by player_id ordered by date, and the session
+lists filter on is_archived and order or range on date. Composite indexes let
+both be served from the index without a separate sort. Attendance needs no new
+index: unique_player_session (player_id, session_id) and
+idx_attendance_session_status_cat (session_id, ...) already cover lookups from
+either side. Uses CREATE INDEX IF NOT EXISTS so it is safe on databases where
+db.create_all() already created them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7a5b8c9d0e1'
+down_revision = 'e6f4a7b8c9d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_payment_player_date "
+        "ON payments (player_id, date)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_session_archived_date "
+        "ON sessions (is_archived, date)"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_session_archived_date")
+    op.execute("DROP INDEX IF EXISTS idx_payment_player_date")
@@ -1,10 +1,32 @@
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from collections import defaultdict, namedtuple
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
 
+def year_month(column):
+    """SQL expression formatting a date/datetime column as 'YYYY-MM' (SQLite locally, PostgreSQL on Render)"""
+    if db.engine.dialect.name == 'postgresql':
+        return db.func.to_char(column, 'YYYY-MM')
+    return db.func.strftime('%Y-%m', column)
+
+
+def round_cents(amount):
+    """Round a money amount to cents the way every figure in the app is rounded: Python's round(amount, 2).
+    SQL ROUND on NUMERIC rounds exact half-cents up (45.125 -> 45.13, round() gives 45.12), so SQL
+    aggregates return unrounded amounts and are rounded with this in Python."""
+    return round(amount, 2)
+
+
+# Per-session cost per regular/adhoc player (Session.per_player_costs)
+SessionCosts = namedtuple('SessionCosts', ['attendee_count', 'regular_cost', 'adhoc_cost'])
+
+
 class Player(db.Model):
     __tablename__ = 'players'
 
@@ -33,15 +55,18 @@ class Player(db.Model):
     updated_by = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    attendances = db.relationship('Attendance', backref='player', lazy='dynamic', cascade='all, delete-orphan', foreign_keys='Attendance.player_id')
-    payments = db.relationship('Payment', backref='player', lazy='dynamic', cascade='all, delete-orphan', foreign_keys='Payment.player_id')
+    attendances = db.relationship('Attendance', back_populates='player', cascade='all, delete-orphan', foreign_keys='Attendance.player_id')
+    payments = db.relationship('Payment', back_populates='player', cascade='all, delete-orphan', foreign_keys='Payment.player_id', order_by='Payment.date.desc()')
+    dropout_refunds = db.relationship('DropoutRefund', back_populates='player', foreign_keys='DropoutRefund.player_id')
 
     # Managed players relationship (players this player can vote/pay for)
-    managed_players = db.relationship('Player', backref=db.backref('manager', remote_side=[id]), foreign_keys=[managed_by])
+    managed_players = db.relationship('Player', back_populates='manager', foreign_keys=[managed_by])
+    manager = db.relationship('Player', back_populates='managed_players', remote_side=[id], foreign_keys=[managed_by])
 
     def set_password(self, password):
         """Set password hash from plain text password"""
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        method = current_app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+        self.password_hash = generate_password_hash(password, method=method)
 
     def check_password(self, password):
         """Check if provided password matches hash"""
@@ -51,9 +76,15 @@ class Player(db.Model):
 
     def get_total_charges(self):
         """Calculate total charges from attended sessions based on player category.
-        Includes YES, DROPOUT, and FILLIN statuses - dropouts and fill-ins are still charged."""
+        Includes YES, DROPOUT, and FILLIN statuses - dropouts and fill-ins are still charged.
+        Memoized on the instance until it is expired (e.g. by a commit)."""
+        cached = getattr(self, '_total_charges', None)
+        if cached is not None:
+            return cached
         total = 0
-        for attendance in self.attendances.filter(Attendance.status.in_(['YES', 'DROPOUT', 'FILLIN'])).all():
+        for attendance in self.attendances:
+            if attendance.status not in ('YES', 'DROPOUT', 'FILLIN'):
+                continue
             session = attendance.session
             if attendance.category == 'kid':
                 # Kids pay flat $11 per session
@@ -64,16 +95,49 @@ class Player(db.Model):
             else:
                 # Regular players: regular court cost / regular players + birdie
                 total += session.get_cost_per_regular_player()
-        return round(total, 2)
+        self._total_charges = round(total, 2)
+        return self._total_charges
 
     def get_total_payments(self):
-        """Calculate total payments made"""
-        return round(sum(p.amount for p in self.payments.all()), 2)
+        """Calculate total payments made (memoized like get_total_charges)"""
+        cached = getattr(self, '_total_payments', None)
+        if cached is None:
+            cached = self._total_payments = round(sum(p.amount for p in self.payments), 2)
+        return cached
 
     def get_balance(self):
         """Calculate outstanding balance (charges - payments)"""
         return round(self.get_total_charges() - self.get_total_payments(), 2)
 
+    @staticmethod
+    def outstanding_balances():
+        """(player, balance) for every player with a balance > 0, largest first.
+        Same figures as get_balance(): chargeable attendances and payment totals come from two
+        statements and are priced and rounded in Python with Session.per_player_costs()."""
+        costs = Session.per_player_costs()
+        charges = defaultdict(float)
+        attendances = db.session.query(Attendance.player_id, Attendance.session_id, Attendance.category).filter(
+            Attendance.status.in_(['YES', 'DROPOUT', 'FILLIN'])
+        ).order_by(Attendance.id)
+        for player_id, session_id, category in attendances:
+            if category == 'kid':
+                charges[player_id] += 11.0
+            elif category == 'adhoc':
+                charges[player_id] += costs[session_id].adhoc_cost
+            else:
+                charges[player_id] += costs[session_id].regular_cost
+        paid = dict(db.session.query(Payment.player_id, db.func.sum(Payment.amount)).group_by(Payment.player_id))
+
+        balances = {}
+        for player_id in charges.keys() | paid.keys():
+            balance = round_cents(round_cents(charges[player_id]) - round_cents(paid.get(player_id) or 0))
+            if balance > 0:
+                balances[player_id] = balance
+        if not balances:
+            return []
+        players = Player.query.filter(Player.id.in_(balances)).order_by(Player.id).all()
+        return sorted(((p, balances[p.id]) for p in players), key=lambda row: -row[1])
+
     def get_pending_refunds_count(self):
         """Count pending refunds for this player"""
         return DropoutRefund.query.filter_by(player_id=self.id, status='pending').count()
@@ -106,6 +170,15 @@ class Player(db.Model):
         }
 
 
+@event.listens_for(Player, 'expire')
+@event.listens_for(Player, 'refresh')
+def clear_player_totals(player, *args):
+    """Drop memoized charges/payments whenever the player's loaded state is expired or refreshed"""
+    if player is not None:  # None once the instance has been garbage collected
+        player._total_charges = None
+        player._total_payments = None
+
+
 class Session(db.Model):
     __tablename__ = 'sessions'
 
@@ -128,37 +201,38 @@ class Session(db.Model):
     updated_by = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    attendances = db.relationship('Attendance', backref='session', lazy='dynamic', cascade='all, delete-orphan')
-    courts = db.relationship('Court', backref='session', lazy='dynamic', cascade='all, delete-orphan', order_by='Court.id')
+    __table_args__ = (
+        db.Index('idx_session_archived_date', 'is_archived', 'date'),  # upcoming/past/archived lists by date
+    )
+
+    attendances = db.relationship('Attendance', back_populates='session', lazy='selectin', cascade='all, delete-orphan')
+    courts = db.relationship('Court', back_populates='session', lazy='selectin', cascade='all, delete-orphan', order_by='Court.id')
+    dropout_refunds = db.relationship('DropoutRefund', back_populates='session')
+    birdie_transactions = db.relationship('BirdieBank', back_populates='session')
+
+    def get_attendance(self, player_id):
+        """The player's attendance row from the loaded attendances (no query), or None"""
+        return next((a for a in self.attendances if a.player_id == player_id), None)
 
     def get_attendee_count(self):
         """Count players who attended (status=YES) plus dropouts (for frozen sessions, dropouts still count toward cost calculation)"""
-        return self.attendances.filter(Attendance.status.in_(['YES', 'DROPOUT'])).count()
+        return sum(1 for a in self.attendances if a.status in ('YES', 'DROPOUT'))
 
     def get_regular_player_count(self):
         """Count regular players who attended (status=YES or DROPOUT - dropouts still count for frozen session cost calculation)"""
-        return self.attendances.filter(
-            Attendance.status.in_(['YES', 'DROPOUT']),
-            Attendance.category == 'regular'
-        ).count()
+        return sum(1 for a in self.attendances if a.status in ('YES', 'DROPOUT') and a.category == 'regular')
 
     def get_adhoc_player_count(self):
         """Count adhoc players who attended (status=YES or DROPOUT - dropouts still count for frozen session cost calculation)"""
-        return self.attendances.filter(
-            Attendance.status.in_(['YES', 'DROPOUT']),
-            Attendance.category == 'adhoc'
-        ).count()
+        return sum(1 for a in self.attendances if a.status in ('YES', 'DROPOUT') and a.category == 'adhoc')
 
     def get_kid_player_count(self):
         """Count kid players who attended (status=YES or DROPOUT - dropouts still count for frozen session cost calculation)"""
-        return self.attendances.filter(
-            Attendance.status.in_(['YES', 'DROPOUT']),
-            Attendance.category == 'kid'
-        ).count()
+        return sum(1 for a in self.attendances if a.status in ('YES', 'DROPOUT') and a.category == 'kid')
 
     def get_court_count(self):
         """Get number of courts booked"""
-        return self.courts.count()
+        return len(self.courts)
 
     def get_suggested_courts(self):
         """Suggest number of courts based on attendees (5 players per court)"""
@@ -170,11 +244,11 @@ class Session(db.Model):
 
     def get_total_cost(self):
         """Calculate total session cost from all courts"""
-        return sum(court.cost for court in self.courts.all())
+        return sum(court.cost for court in self.courts)
 
     def get_time_range(self):
         """Get overall time range from all courts, or session defaults if no courts"""
-        court_list = self.courts.all()
+        court_list = self.courts
         if not court_list:
             # Use session's stored times if no courts yet
             if self.start_time and self.end_time:
@@ -200,23 +274,20 @@ class Session(db.Model):
         # This returns the regular player cost as the default display
         return self.get_cost_per_regular_player()
 
+    @staticmethod
+    def per_player_cost(court_cost, player_count, birdie_cost):
+        """Court cost split between player_count players plus birdie, rounded to cents (0 with no players)"""
+        if player_count == 0:
+            return 0
+        return round_cents(court_cost / player_count + birdie_cost)
+
     def get_cost_per_regular_player(self):
         """Calculate cost per regular player: regular court cost / regular players + birdie"""
-        regular_count = self.get_regular_player_count()
-        if regular_count == 0:
-            return 0
-        regular_court_cost = self.get_regular_court_cost()
-        court_cost_per_player = regular_court_cost / regular_count
-        return round(court_cost_per_player + self.birdie_cost, 2)
+        return Session.per_player_cost(self.get_regular_court_cost(), self.get_regular_player_count(), self.birdie_cost)
 
     def get_cost_per_adhoc_player(self):
         """Calculate cost per adhoc player: adhoc court cost / adhoc players + birdie"""
-        adhoc_count = self.get_adhoc_player_count()
-        if adhoc_count == 0:
-            return 0
-        adhoc_court_cost = self.get_adhoc_court_cost()
-        court_cost_per_player = adhoc_court_cost / adhoc_count
-        return round(court_cost_per_player + self.birdie_cost, 2)
+        return Session.per_player_cost(self.get_adhoc_court_cost(), self.get_adhoc_player_count(), self.birdie_cost)
 
     def get_cost_per_kid(self):
         """Kids pay flat $11 per session, no birdie cost"""
@@ -224,11 +295,11 @@ class Session(db.Model):
 
     def get_dropout_count(self):
         """Count players who dropped out"""
-        return self.attendances.filter_by(status='DROPOUT').count()
+        return sum(1 for a in self.attendances if a.status == 'DROPOUT')
 
     def get_fillin_count(self):
         """Count fill-in players"""
-        return self.attendances.filter_by(status='FILLIN').count()
+        return sum(1 for a in self.attendances if a.status == 'FILLIN')
 
     def calculate_suggested_refund(self):
         """
@@ -254,11 +325,11 @@ class Session(db.Model):
 
     def get_regular_court_cost(self):
         """Get total cost of regular courts"""
-        return sum(court.cost for court in self.courts.all() if court.court_type == 'regular')
+        return sum(court.cost for court in self.courts if court.court_type == 'regular')
 
     def get_adhoc_court_cost(self):
         """Get total cost of adhoc courts"""
-        return sum(court.cost for court in self.courts.all() if court.court_type == 'adhoc')
+        return sum(court.cost for court in self.courts if court.court_type == 'adhoc')
 
     def get_total_refunds(self):
         """Get total refunds given for this session"""
@@ -272,16 +343,71 @@ class Session(db.Model):
         - Adhoc players: adhoc court cost / adhoc count + birdie
         - Kids: flat $11
         """
+        # Each get_cost_per_* call scans all attendances, so work them out once, not per attendance
+        costs = {
+            'kid': self.get_cost_per_kid(),
+            'adhoc': self.get_cost_per_adhoc_player(),
+            'regular': self.get_cost_per_regular_player(),
+        }
         total = 0
-        for attendance in self.attendances.filter(Attendance.status.in_(['YES', 'DROPOUT', 'FILLIN'])).all():
-            if attendance.category == 'kid':
-                total += self.get_cost_per_kid()
-            elif attendance.category == 'adhoc':
-                total += self.get_cost_per_adhoc_player()
-            else:
-                total += self.get_cost_per_regular_player()
+        for attendance in self.attendances:
+            if attendance.status not in ('YES', 'DROPOUT', 'FILLIN'):
+                continue
+            total += costs.get(attendance.category, costs['regular'])
         return round(total, 2)
 
+    @staticmethod
+    def per_player_costs(session_id=None):
+        """{session_id: SessionCosts(attendee_count, regular_cost, adhoc_cost)} for every session (or just session_id).
+        Player counts and court totals are aggregated in one SQL statement; the split and rounding use
+        per_player_cost() in Python, so the costs are exactly get_cost_per_regular_player()/get_cost_per_adhoc_player()."""
+        counted = Attendance.status.in_(['YES', 'DROPOUT'])
+        counts = db.session.query(
+            Attendance.session_id.label('session_id'),
+            db.func.count(Attendance.id).filter(counted).label('attendee_count'),
+            db.func.count(Attendance.id).filter(counted, Attendance.category == 'regular').label('regular_count'),
+            db.func.count(Attendance.id).filter(counted, Attendance.category == 'adhoc').label('adhoc_count')
+        )
+        court_costs = db.session.query(
+            Court.session_id.label('session_id'),
+            db.func.sum(Court.cost).filter(Court.court_type == 'regular').label('regular_court_cost'),
+            db.func.sum(Court.cost).filter(Court.court_type == 'adhoc').label('adhoc_court_cost')
+        )
+        sessions = db.session.query(Session)
+        if session_id is not None:
+            counts = counts.filter(Attendance.session_id == session_id)
+            court_costs = court_costs.filter(Court.session_id == session_id)
+            sessions = sessions.filter(Session.id == session_id)
+        counts = counts.group_by(Attendance.session_id).subquery()
+        court_costs = court_costs.group_by(Court.session_id).subquery()
+
+        rows = sessions.with_entities(
+            Session.id,
+            Session.birdie_cost,
+            db.func.coalesce(counts.c.attendee_count, 0).label('attendee_count'),
+            db.func.coalesce(counts.c.regular_count, 0).label('regular_count'),
+            db.func.coalesce(counts.c.adhoc_count, 0).label('adhoc_count'),
+            db.func.coalesce(court_costs.c.regular_court_cost, 0.0).label('regular_court_cost'),
+            db.func.coalesce(court_costs.c.adhoc_court_cost, 0.0).label('adhoc_court_cost')
+        ).outerjoin(counts, counts.c.session_id == Session.id).outerjoin(
+            court_costs, court_costs.c.session_id == Session.id
+        ).all()
+        return {
+            row.id: SessionCosts(
+                row.attendee_count,
+                Session.per_player_cost(row.regular_court_cost, row.regular_count, row.birdie_cost),
+                Session.per_player_cost(row.adhoc_court_cost, row.adhoc_count, row.birdie_cost)
+            )
+            for row in rows
+        }
+
+    @staticmethod
+    def attendee_stats(session_id):
+        """(attendee_count, cost_per_player) for one session in a single query,
+        same values as get_attendee_count()/get_cost_per_player() without loading attendances or courts"""
+        costs = Session.per_player_costs(session_id)[session_id]
+        return costs.attendee_count, costs.regular_cost
+
     def get_birdie_cost_total(self):
         """Get total birdie cost for the session (birdie_cost * non-kid attendees)"""
         non_kid_count = self.get_regular_player_count() + self.get_adhoc_player_count()
@@ -339,6 +465,8 @@ class Court(db.Model):
     updated_by = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    session = db.relationship('Session', back_populates='courts')
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -376,6 +504,56 @@ class Attendance(db.Model):
         db.Index('idx_attendance_session_status_cat', 'session_id', 'status', 'category'),
     )
 
+    player = db.relationship('Player', back_populates='attendances', foreign_keys=[player_id])
+    session = db.relationship('Session', back_populates='attendances')
+
+    @staticmethod
+    def _dialect_insert():
+        """INSERT construct supporting ON CONFLICT for the current database (PostgreSQL on Render, SQLite locally)"""
+        return postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+
+    @staticmethod
+    def insert_missing(rows):
+        """Bulk-insert attendance rows (dicts) in one statement, skipping any (player_id, session_id)
+        that already has a row"""
+        if not rows:
+            return
+        stmt = Attendance._dialect_insert()(Attendance).on_conflict_do_nothing(
+            index_elements=['player_id', 'session_id']
+        )
+        db.session.execute(stmt, rows)
+
+    @staticmethod
+    def upsert(player_id, session_id, values, insert_defaults=None):
+        """Insert or update the attendance row for (player_id, session_id) in one
+        INSERT ... ON CONFLICT DO UPDATE statement. Only `values` are updated on conflict;
+        `insert_defaults` (e.g. category) are used for new rows only."""
+        stmt = Attendance._dialect_insert()(Attendance).values(player_id=player_id, session_id=session_id, **values, **(insert_defaults or {}))
+        db.session.execute(Attendance._update_on_conflict(stmt, values))
+
+    @staticmethod
+    def upsert_many(rows, update_keys):
+        """Insert or update many attendance rows (dicts with player_id, session_id and plain values) in one
+        INSERT ... ON CONFLICT DO UPDATE statement. Only `update_keys` are updated on conflict."""
+        if not rows:
+            return
+        stmt = Attendance._dialect_insert()(Attendance)
+        db.session.execute(Attendance._update_on_conflict(stmt, update_keys), rows)
+
+    @staticmethod
+    def _update_on_conflict(stmt, update_keys):
+        """ON CONFLICT (player_id, session_id) DO UPDATE clause setting `update_keys` from the new row"""
+        return stmt.on_conflict_do_update(
+            index_elements=['player_id', 'session_id'],
+            set_={**{key: stmt.excluded[key] for key in update_keys}, 'updated_at': datetime.utcnow()}
+        )
+
+    @staticmethod
+    def default_category(player_id):
+        """SQL expression for the category a new attendance row takes (the player's, else 'regular')"""
+        player_category = db.session.query(Player.category).filter(Player.id == player_id).scalar_subquery()
+        return db.func.coalesce(player_category, 'regular')
+
     def get_session_cost(self):
         """Calculate total cost for this player in this session (birdie + additional)"""
         session = self.session
@@ -414,6 +592,12 @@ class Payment(db.Model):
     updated_by = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('idx_payment_player_date', 'player_id', 'date'),  # a player's payments newest first (read backwards)
+    )
+
+    player = db.relationship('Player', back_populates='payments', foreign_keys=[player_id])
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -438,6 +622,8 @@ class DropoutRefund(db.Model):
     instructions = db.Column(db.Text)  # Admin instructions/notes
     status = db.Column(db.String(20), default='pending', index=True)  # pending, processed, cancelled
     processed_date = db.Column(db.DateTime, nullable=True)
+    # Credit payment created when the refund was processed
+    payment_id = db.Column(db.Integer, db.ForeignKey('payments.id', ondelete='SET NULL'), nullable=True)
 
     # Audit fields
     created_by = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=True)
@@ -447,10 +633,12 @@ class DropoutRefund(db.Model):
 
     __table_args__ = (
         db.Index('idx_refund_player_status', 'player_id', 'status'),
+        db.Index('idx_refund_session_player', 'session_id', 'player_id'),  # a player's refund for a session
     )
 
-    player = db.relationship('Player', foreign_keys=[player_id], backref='dropout_refunds')
-    session = db.relationship('Session', backref='dropout_refunds')
+    player = db.relationship('Player', back_populates='dropout_refunds', foreign_keys=[player_id])
+    session = db.relationship('Session', back_populates='dropout_refunds')
+    payment = db.relationship('Payment')
 
     def to_dict(self):
         return {
@@ -484,7 +672,7 @@ class BirdieBank(db.Model):
     updated_by = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    session = db.relationship('Session', backref='birdie_transactions')
+    session = db.relationship('Session', back_populates='birdie_transactions')
 
     def to_dict(self):
         return {
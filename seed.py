@@ -5,6 +5,8 @@ from models import Player, Session, Attendance, Payment
 
 def seed_database():
     with app.app_context():
+        db.create_all()
+
         # Clear existing data
         Attendance.query.delete()
         Payment.query.delete()
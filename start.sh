@@ -9,9 +9,10 @@ from flask_migrate import upgrade, stamp
 from sqlalchemy import inspect, text
 
 with app.app_context():
-    inspector = inspect(db.engine)
-    has_alembic = inspector.has_table('alembic_version')
-    has_players = inspector.has_table('players')
+    # One catalog query for both checks (each has_table() call is a round-trip to the database)
+    tables = set(inspect(db.engine).get_table_names())
+    has_alembic = 'alembic_version' in tables
+    has_players = 'players' in tables
 
     if not has_alembic:
         if not has_players:
@@ -32,5 +33,23 @@ with app.app_context():
         print("Migrations applied.")
 PYEOF
 
+# Threaded workers: the JSON endpoints mostly wait on a single DB round-trip, so each
+# worker process serves several requests at once instead of one at a time.
+# --preload imports the app once in the master (importing opens no DB connections)
+# Without REDIS_URL the cache and rate-limit counters live in each worker process, so a second
+# worker would serve stale cached totals and double the login limit: run a single worker then
+if [ -n "$REDIS_URL" ]; then
+    workers="${WEB_CONCURRENCY:-2}"
+else
+    if [ "${WEB_CONCURRENCY:-1}" != "1" ]; then
+        echo "REDIS_URL is not set; ignoring WEB_CONCURRENCY=$WEB_CONCURRENCY and running 1 worker."
+    fi
+    workers=1
+fi
+
 echo "Starting gunicorn..."
-exec gunicorn app:app
+exec gunicorn app:app \
+    --preload \
+    --worker-class gthread \
+    --workers "$workers" \
+    --threads "${GUNICORN_THREADS:-4}"
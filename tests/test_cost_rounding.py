@@ -0,0 +1,86 @@
+"""Per-player costs computed in SQL must match the Python per-session methods, including on exact half-cents."""
+import os
+import tempfile
+from datetime import date
+
+import pytest
+
+# app.py reads DATABASE_URL at import time and creates logs/ in the working directory
+_tmpdir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(_tmpdir, "test.db")}'
+os.chdir(_tmpdir)
+
+from app import app, clear_session_cache, get_cached_monthly_summary  # noqa: E402
+from models import db, Player, Session, Court, Attendance, round_cents  # noqa: E402
+
+
+@pytest.fixture
+def ctx():
+    with app.app_context():
+        db.create_all()
+        yield
+        db.session.remove()
+        db.drop_all()
+
+
+def make_session(court_cost, court_type, category, players, birdie_cost):
+    session = Session(date=date(2026, 1, 10), birdie_cost=birdie_cost)
+    db.session.add(session)
+    db.session.flush()
+    db.session.add(Court(session_id=session.id, start_time='7:00 AM', end_time='9:00 AM',
+                         cost=court_cost, court_type=court_type))
+    for i in range(players):
+        player = Player(name=f'{category} {i}', category=category)
+        db.session.add(player)
+        db.session.flush()
+        db.session.add(Attendance(player_id=player.id, session_id=session.id, status='YES', category=category))
+    db.session.commit()
+    return session
+
+
+def test_round_cents_rounds_like_python():
+    # 45.125 is exact in binary: round() gives 45.12, SQL NUMERIC ROUND would give 45.13
+    assert round_cents(345 / 8 + 2) == 45.12
+
+
+@pytest.mark.parametrize('court_cost,players,birdie_cost,expected', [
+    (345, 8, 2, 45.12),      # 43.125 + 2 = 45.125
+    (100.5, 4, 0, 25.12),    # 25.125
+    (10.1, 4, 0.5, 3.02),    # 3.025 (binary just below the half)
+    (200, 3, 1.75, 68.42),
+])
+def test_sql_costs_match_python(ctx, court_cost, players, birdie_cost, expected):
+    regular = make_session(court_cost, 'regular', 'regular', players, birdie_cost)
+    adhoc = make_session(court_cost, 'adhoc', 'adhoc', players, birdie_cost)
+
+    costs = Session.per_player_costs()
+    assert costs[regular.id].regular_cost == regular.get_cost_per_regular_player() == expected
+    assert costs[adhoc.id].adhoc_cost == adhoc.get_cost_per_adhoc_player() == expected
+    assert costs[regular.id].attendee_count == players
+    assert Session.per_player_costs(regular.id)[regular.id] == costs[regular.id]
+
+
+def test_outstanding_balances_match_get_balance(ctx):
+    make_session(345, 'regular', 'regular', 8, 2)
+    make_session(100.5, 'adhoc', 'adhoc', 4, 0)
+
+    expected = sorted(((p.id, p.get_balance()) for p in Player.query.all() if p.get_balance() > 0),
+                      key=lambda row: -row[1])
+    assert [(p.id, balance) for p, balance in Player.outstanding_balances()] == expected
+    assert expected[0][1] == 45.12
+
+
+def test_attendee_stats_match_session_methods(ctx):
+    session = make_session(345, 'regular', 'regular', 8, 2)
+    assert Session.attendee_stats(session.id) == (session.get_attendee_count(), session.get_cost_per_player()) == (8, 45.12)
+
+
+def test_monthly_summary_matches_session_methods(ctx):
+    sessions = [make_session(345, 'regular', 'regular', 8, 2), make_session(100.5, 'adhoc', 'adhoc', 4, 0)]
+    clear_session_cache()
+    [(ym, summary)] = get_cached_monthly_summary()
+
+    assert ym == '2026-01'
+    assert summary['regular_charges'] == sum(s.get_regular_player_charges() for s in sessions) == 360.96
+    assert summary['adhoc_charges'] == sum(s.get_adhoc_player_charges() for s in sessions)
+    assert summary['total_collection'] == sum(s.get_total_collection() for s in sessions)